@@ -0,0 +1,62 @@
+# Comparaison Octree / BVH sur bunny.obj: temps de construction et vitesse de traversée
+# Usage (depuis src/): python -m benchmarks.acceleration [--width 160] [--height 120]
+
+import argparse
+import os
+import time
+import numpy as np
+from glm import vec3
+
+from classes.camera import Camera
+from classes.objects.bvh import BVH
+from classes.objects.octree import Octree
+from utils.parser import parse_obj
+
+BUNNY_PATH = os.path.join(os.path.dirname(__file__), "..", "assets", "bunny.obj")
+
+def loadBunny():
+	# Même placement que dans les scènes
+	model = parse_obj(BUNNY_PATH)
+	model.scale(10)
+	model.translate(vec3(0, -1, -2.5))
+	model.generate_triangles()
+	return model
+
+def buildOctree(model):
+	octree = Octree(model)
+	octree.generate_octree()
+	return octree
+
+def timeit(function, *args):
+	start = time.perf_counter()
+	result = function(*args)
+	return result, time.perf_counter() - start
+
+def main():
+	parser = argparse.ArgumentParser(description="Compare Octree and BVH build and traversal times on bunny.obj")
+	parser.add_argument("--width", type=int, default=160)
+	parser.add_argument("--height", type=int, default=120)
+	args = parser.parse_args()
+
+	model = loadBunny()
+
+	# Caméra cadrée sur le lapin pour que la plupart des rayons atteignent le maillage
+	camera = Camera(fov_y=25, position=vec3(0, 0, 0), target=vec3(0, -0.5, -2.5), screen_width=args.width, screen_height=args.height)
+	rays = [camera.ray(x, y) for y in range(args.height) for x in range(args.width)]
+
+	y, x = np.mgrid[0:args.height, 0:args.width]
+	origins, directions = camera.rayPacket(x.ravel().astype(np.float64), y.ravel().astype(np.float64))
+
+	print(f"{len(model.triangles)} triangles, {len(rays)} rays")
+	print(f"{'structure':<10}{'build (s)':>12}{'scalar (s)':>12}{'rays/s':>12}{'packet (s)':>12}{'rays/s':>12}{'hits':>8}")
+
+	for name, build in (("Octree", buildOctree), ("BVH", BVH)):
+		structure, buildTime = timeit(build, model)
+		hits, scalarTime = timeit(lambda: [structure.hit(ray) for ray in rays])
+		_, packetTime = timeit(structure.hitPacket, origins, directions)
+
+		hitCount = sum(t is not None for t in hits)
+		print(f"{name:<10}{buildTime:>12.3f}{scalarTime:>12.3f}{len(rays) / scalarTime:>12.0f}{packetTime:>12.3f}{len(rays) / packetTime:>12.0f}{hitCount:>8}")
+
+if __name__ == "__main__":
+	main()
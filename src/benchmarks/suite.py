@@ -0,0 +1,219 @@
+# Benchmarks des scènes de src/scenes et micro-benchmarks des intersections, comparés à une référence enregistrée
+# Usage (depuis src/): python -m benchmarks.suite [--scenes main water_drop] [--resolutions 64x48 160x120] [--samples 1 4] [--packet]
+#                      [--save-baseline] [--threshold 0.25]
+# Le code de sortie est 1 si un résultat régresse de plus du seuil par rapport à la référence.
+
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import sys
+import time
+import numpy as np
+from glm import vec3
+
+from benchmarks.acceleration import loadBunny, buildOctree, timeit
+from classes.camera import Camera
+from classes.renderer import Renderer
+from classes.scene import Scene
+from classes.stats import RenderStats
+from classes.objects.sphere import Sphere
+from classes.objects.triangle import Triangle
+from classes.ray import Ray
+from constants import MAX_DEPTH
+
+from scenes.main import createMain
+from scenes.glass_bunny_spotlight import createGlassBunnySpotlight
+from scenes.mirror_spheres import createMirrorSpheres
+from scenes.glass_spheres import createGlassSpheres
+from scenes.reflections import createReflections
+from scenes.water_drop import createWaterDrop
+
+try:
+	import resource
+except ImportError: # Windows: pas de mesure de la mémoire
+	resource = None
+
+SCENES = {
+	"main": createMain,
+	"reflections": createReflections,
+	"glass_spheres": createGlassSpheres,
+	"water_drop": createWaterDrop,
+	"mirror_spheres": createMirrorSpheres,
+	"glass_bunny_spotlight": createGlassBunnySpotlight,
+}
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+# Métriques comparées à la référence, et celles pour lesquelles une valeur plus grande est meilleure
+COMPARED = ("wallTime", "raysPerSecond", "buildTime", "peakMemory", "nsPerCall")
+HIGHER_IS_BETTER = ("raysPerSecond",)
+TIMES = ("wallTime", "buildTime")
+
+MICRO_RAYS = 2000
+
+def benchScene(name: str, width: int, height: int, samples: int, packet: bool, repeat: int) -> dict:
+	"""Construit et rend une scène. Exécuté dans un processus neuf pour que le pic mémoire ne mesure que cette scène."""
+	scene = Scene()
+
+	# Construction de la scène et de la structure d'accélération de haut niveau (sinon construite au premier rayon)
+	start = time.perf_counter()
+	SCENES[name](scene)
+	scene.accelerator
+	buildTime = time.perf_counter() - start
+
+	renderer = Renderer(Camera(fov_y=90, position=vec3(0, 0, 0), target=vec3(0, 0, -1)), width, height, samples, MAX_DEPTH)
+	render = renderer.renderPacket if packet else renderer.render
+
+	wallTime = min(timeit(render, scene)[1] for _ in range(repeat))
+
+	# Les rayons sont comptés dans un rendu à part pour ne pas chronométrer l'instrumentation
+	renderer.stats = RenderStats()
+	render(scene)
+	rays = renderer.stats.report()["rays"]["total"]
+
+	# ru_maxrss est en kilo-octets sous Linux, en octets sous macOS
+	peakMemory = None
+
+	if resource is not None:
+		peakMemory = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * (1 if sys.platform == "darwin" else 1024)
+
+	return {
+		"wallTime": wallTime,
+		"rays": rays,
+		"raysPerSecond": rays / wallTime,
+		"buildTime": buildTime,
+		"peakMemory": peakMemory,
+	}
+
+def aimedRays(count: int, target_min, target_max, seed: int = 0) -> list[Ray]:
+	"""Rayons depuis l'origine vers des points uniformes de la boîte [target_min, target_max], reproductibles."""
+	points = np.random.default_rng(seed).uniform(tuple(target_min), tuple(target_max), (count, 3))
+	return [Ray(vec3(0, 0, 0), vec3(*point)) for point in points.tolist()]
+
+def benchMicro(repeat: int) -> dict:
+	"""Temps moyen d'un appel à hit, en nanosecondes, sur des rayons dont une partie manque l'objet."""
+	sphere = Sphere(vec3(0, 0, -3), 1.0)
+	triangle = Triangle(vec3(-1, -1, -3), vec3(1, -1, -3), vec3(0, 1, -3))
+	octree = buildOctree(loadBunny())
+
+	cases = (
+		("Sphere.hit", sphere, aimedRays(MICRO_RAYS, (-1.5, -1.5, -3), (1.5, 1.5, -3))),
+		("Triangle.hit", triangle, aimedRays(MICRO_RAYS, (-1.5, -1.5, -3), (1.5, 1.5, -3))),
+		("Octree.hit", octree, aimedRays(MICRO_RAYS, octree.min, octree.max)),
+	)
+
+	results = {}
+
+	for name, object, rays in cases:
+		elapsed = min(timeit(lambda: [object.hit(ray) for ray in rays])[1] for _ in range(repeat))
+		results[name] = {"nsPerCall": elapsed / len(rays) * 1e9}
+
+	return results
+
+def compare(results: dict, baseline: dict, threshold: float, minTime: float) -> list[str]:
+	"""Affiche l'évolution de chaque métrique par rapport à la référence et renvoie la liste des régressions."""
+	regressions = []
+
+	for section in ("scenes", "micro"):
+		for key, metrics in results.get(section, {}).items():
+			reference = baseline.get(section, {}).get(key)
+
+			if reference is None:
+				continue
+
+			for metric in COMPARED:
+				old, new = reference.get(metric), metrics.get(metric)
+
+				if not old or new is None:
+					continue
+
+				# Les temps trop courts (structures chargées depuis le cache) sont du bruit
+				if metric in TIMES and max(old, new) < minTime:
+					continue
+
+				change = old / new - 1 if metric in HIGHER_IS_BETTER else new / old - 1
+				regressed = change > threshold
+				line = f"{key} {metric}: {old:.4g} -> {new:.4g} ({change * 100:+.1f}%)"
+
+				if regressed:
+					regressions.append(line)
+
+				print(("REGRESSION " if regressed else "           ") + line)
+
+	return regressions
+
+def parseResolution(text: str) -> tuple[int, int]:
+	width, height = text.lower().split("x")
+	return int(width), int(height)
+
+def main():
+	parser = argparse.ArgumentParser(description="Benchmark the bundled scenes and the intersection routines against a stored baseline")
+	parser.add_argument("--scenes", nargs="+", choices=list(SCENES), default=list(SCENES))
+	parser.add_argument("--resolutions", nargs="+", type=parseResolution, default=[(64, 48)], help="WIDTHxHEIGHT")
+	parser.add_argument("--samples", nargs="+", type=int, default=[1])
+	parser.add_argument("--packet", action="store_true", help="render with renderPacket instead of render")
+	parser.add_argument("--repeat", type=int, default=3, help="the best of REPEAT runs is kept")
+	parser.add_argument("--no-micro", dest="micro", action="store_false", help="skip the Sphere/Triangle/Octree micro-benchmarks")
+	parser.add_argument("--baseline", default=BASELINE_PATH)
+	parser.add_argument("--save-baseline", action="store_true", help="store these results as the new baseline")
+	parser.add_argument("--threshold", type=float, default=0.25, help="relative slowdown counted as a regression")
+	parser.add_argument("--min-time", type=float, default=0.01, help="wall and build times below this many seconds are not compared")
+	parser.add_argument("--output", help="also write the results to this JSON file")
+	args = parser.parse_args()
+
+	results = {"python": platform.python_version(), "machine": platform.machine(), "scenes": {}, "micro": {}}
+	path = "packet" if args.packet else "scalar"
+
+	print(f"{'scene':<24}{'size':>10}{'spp':>5}{'build (s)':>11}{'wall (s)':>10}{'rays':>10}{'rays/s':>10}{'peak (MB)':>11}")
+
+	# Un processus neuf (spawn) par mesure: pic mémoire et caches propres à chaque scène
+	context = multiprocessing.get_context("spawn")
+
+	for name in args.scenes:
+		for width, height in args.resolutions:
+			for samples in args.samples:
+				with context.Pool(1) as pool:
+					result = pool.apply(benchScene, (name, width, height, samples, args.packet, args.repeat))
+
+				results["scenes"][f"{name}@{width}x{height}x{samples}/{path}"] = result
+
+				peak = f"{result['peakMemory'] / 2 ** 20:.0f}" if result["peakMemory"] is not None else "-"
+				print(f"{name:<24}{f'{width}x{height}':>10}{samples:>5}{result['buildTime']:>11.3f}{result['wallTime']:>10.3f}{result['rays']:>10}{result['raysPerSecond']:>10.0f}{peak:>11}")
+
+	if args.micro:
+		results["micro"] = benchMicro(args.repeat)
+
+		for name, result in results["micro"].items():
+			print(f"{name:<24}{result['nsPerCall']:>10.0f} ns/call")
+
+	if args.output:
+		with open(args.output, "w") as file:
+			json.dump(results, file, indent=2)
+
+	if args.save_baseline:
+		with open(args.baseline, "w") as file:
+			json.dump(results, file, indent=2)
+
+		print(f"Saved baseline to {args.baseline}")
+		return
+
+	if not os.path.exists(args.baseline):
+		print(f"No baseline at {args.baseline}, run with --save-baseline to create one")
+		return
+
+	with open(args.baseline) as file:
+		baseline = json.load(file)
+
+	print("\nChange against the baseline (positive is worse):")
+	regressions = compare(results, baseline, args.threshold, args.min_time)
+
+	if regressions:
+		print(f"\n{len(regressions)} regression(s) beyond {args.threshold * 100:.0f}%")
+		sys.exit(1)
+
+	print(f"\nNo regression beyond {args.threshold * 100:.0f}%")
+
+if __name__ == "__main__":
+	main()
@@ -1,6 +1,8 @@
 # Class for the camera
 
+from typing import Optional
 from pyglm import glm
+import numpy as np
 from classes.ray import Ray
 
 class Camera():
@@ -10,6 +12,7 @@ class Camera():
     screen_width = 0
 
     position = [0,0,0]
+    target = [0,0,-1]
 
     up_vector = [0,1,0]
 
@@ -17,28 +20,69 @@ class Camera():
 
     def __init__(self, fov_y, position, target, screen_width = 1920, screen_height = 1080) -> None:
         self.position = position
+        self.target = target
         self.fov_y = glm.radians(fov_y)
         self.screen_height = screen_height
         self.screen_width = screen_width
-        view_matrix = glm.lookAt(position, target, self.up_vector)
+        self.update()
+
+    def update(self) -> None:
+        """
+        Précalcule la base de la caméra et les pas entre pixels. À rappeler après avoir modifié position, target ou fov_y
+        (resize le fait déjà): la direction du pixel (x, y) est corner + (x + 0.5) * pixel_delta_u + (y + 0.5) * pixel_delta_v.
+        """
+        view_matrix = glm.lookAt(self.position, self.target, self.up_vector)
         self.eye_to_world_matrix = glm.inverse(view_matrix)
-    
-    def ray(self, x, y):
+
         aspect_ratio = self.screen_width / self.screen_height
-        
-        origin = glm.vec3(self.position)
-
-        direction = glm.vec3(
-            ((x + 0.5) / self.screen_width * 2 - 1) * aspect_ratio * glm.tan(self.fov_y / 2),
-            -((y + 0.5) / self.screen_height * 2 - 1) * glm.tan(self.fov_y / 2),
-            -1
-		)
-        
-        direction = glm.vec3(self.eye_to_world_matrix * glm.vec4(direction.x, direction.y, direction.z, 0.0))
-        direction = glm.normalize(direction)
-        
-        return Ray(origin, direction)
-    
+        tan_half_fov = glm.tan(self.fov_y / 2)
+
+        # Axes de l'espace caméra exprimés dans l'espace monde
+        rotation = glm.mat3(self.eye_to_world_matrix)
+        right, up, forward = rotation[0], rotation[1], -rotation[2]
+
+        self.origin = glm.vec3(self.position)
+        self.pixel_delta_u = right * (2 * aspect_ratio * tan_half_fov / self.screen_width)
+        self.pixel_delta_v = up * (-2 * tan_half_fov / self.screen_height)
+        self.corner = forward - right * (aspect_ratio * tan_half_fov) + up * tan_half_fov
+
+        # Copies NumPy pour les paquets de rayons
+        self._origin = np.array(self.origin, dtype=np.float64)
+        self._pixel_delta_u = np.array(self.pixel_delta_u, dtype=np.float64)
+        self._pixel_delta_v = np.array(self.pixel_delta_v, dtype=np.float64)
+        self._corner = np.array(self.corner, dtype=np.float64)
+
+    def ray(self, x, y):
+        # Ray normalise la direction
+        return Ray(self.origin, self.corner + (x + 0.5) * self.pixel_delta_u + (y + 0.5) * self.pixel_delta_v)
+
+    def rayPacket(self, x: np.ndarray, y: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """Version vectorisée de ray: renvoie les origines et directions (N,3) pour des tableaux de pixels."""
+        directions = np.outer(x + 0.5, self._pixel_delta_u)
+        directions += np.outer(y + 0.5, self._pixel_delta_v)
+        directions += self._corner
+        directions /= np.sqrt(np.einsum("ij,ij->i", directions, directions))[:, None]
+
+        origins = np.broadcast_to(self._origin, directions.shape)
+
+        return origins, directions
+
+    def tileRays(self, xOffset: int, yOffset: int, width: int, height: int, offsets: Optional[np.ndarray] = None) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Rayons primaires d'une tuile (ou de toute l'image) en un appel, pixels dans l'ordre des lignes.
+        offsets: décalages (width * height, 2) optionnels en pixels, ajoutés aux positions des pixels (anti-aliasing).
+        """
+        y, x = np.mgrid[yOffset:yOffset + height, xOffset:xOffset + width]
+        x = x.ravel().astype(np.float64)
+        y = y.ravel().astype(np.float64)
+
+        if offsets is not None:
+            x += offsets[:, 0]
+            y += offsets[:, 1]
+
+        return self.rayPacket(x, y)
+
     def resize(self, width: int, height: int) -> None:
         self.screen_width = width
-        self.screen_height = height
\ No newline at end of file
+        self.screen_height = height
+        self.update()
@@ -0,0 +1,15 @@
+from pyglm import glm
+
+class Hit:
+	t: float # Distance le long du rayon
+	normal: glm.vec3 # Normale unitaire de la surface au point d'intersection
+	primitive: int # Indice de la primitive touchée (triangle d'un maillage, 0 sinon)
+	u: float # Coordonnées barycentriques du point sur la primitive
+	v: float
+
+	def __init__(self, t: float, normal: glm.vec3, primitive: int = 0, u: float = 0.0, v: float = 0.0) -> None:
+		self.t = t
+		self.normal = normal
+		self.primitive = primitive
+		self.u = u
+		self.v = v
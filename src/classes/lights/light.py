@@ -1,8 +1,32 @@
 from classes.ray import Ray
 from classes.objects.object import Object
-from typing import List, Optional
+from typing import TYPE_CHECKING, Optional
 from pyglm import glm
-from constants import EPSILON
+import numpy as np
+from classes.material import MaterialTable
+from classes.lights.light_bvh import LightBVH, influenceRadius
+from classes.samplers.sampler import hashFloat, hashFloats
+from constants import EPSILON, PACKET_SIZE, LIGHT_CUTOFF
+import bisect
+import itertools
+import struct
+
+if TYPE_CHECKING:
+	from classes.scene import Scene
+
+# Les tirages de lumières hachent la position du point en float32, arrondie à SAMPLE_DROPPED_BITS bits de mantisse près:
+# les intersections du chemin scalaire (glm, float32) et des paquets (float64) diffèrent de quelques ulp et doivent
+# tirer les mêmes lumières. L'arrondi au plus proche garde les coordonnées rondes (murs en y = 3) loin des frontières.
+SAMPLE_DROPPED_BITS = 12
+
+def sampleBits(points: np.ndarray) -> np.ndarray:
+	"""Entiers (N,3) hachés pour les tirages de lumières des points (N,3)."""
+	bits = np.asarray(points, dtype=np.float32).view(np.int32).astype(np.int64)
+	return (bits + (1 << (SAMPLE_DROPPED_BITS - 1))) >> SAMPLE_DROPPED_BITS
+
+def sampleBit(point: tuple[float, float, float]) -> tuple[int, int, int]:
+	"""Version scalaire de sampleBits (mêmes entiers) pour un seul point."""
+	return tuple((bits + (1 << (SAMPLE_DROPPED_BITS - 1))) >> SAMPLE_DROPPED_BITS for bits in struct.unpack("3i", struct.pack("3f", *point)))
 
 class Light:
 	origin: glm.vec3
@@ -17,16 +41,15 @@ class Light:
 		self.intensity = intensity
 		self.color = color or glm.vec3(1.0, 1.0, 1.0) # Lumière blanche par defaut
 
-	def getContribution(self, objects: List[Object], object: Object, intersection: glm.vec3, viewDir: glm.vec3) -> glm.vec3:	
+	def getContribution(self, scene: "Scene", object: Object, intersection: glm.vec3, normal: glm.vec3, viewDir: glm.vec3) -> glm.vec3:	
 		# Si'l y a une occlusion, pas de contribution lumineuse
-		if self.isInShadow(intersection, objects):
+		if self.isInShadow(intersection, scene):
 			return glm.vec3(0, 0, 0)
 		
 		# Calculer l'atténuation en fonction de la distance
 		attenuation = self.getAttenuationFactor(intersection)
 
 		Dl = glm.normalize(self.origin - intersection) # La direction de la lumière
-		normal = object.getNormal(intersection) # La normale de la surface
 		
 		# Calculer les contributions diffuse et spéculaire
 		diffuse_factor = self.diffuse(object, Dl, normal)
@@ -50,12 +73,20 @@ class Light:
 		
 		return object.material.specular * specular_intensity * self.intensity
 	
+	def coneFactor(self, intersection: glm.vec3) -> float:
+		"""Fraction de l'intensité reçue en un point selon la direction de la lumière (1 pour une lumière omnidirectionnelle)."""
+		return 1.0
+
+	def cone(self) -> Optional[tuple[glm.vec3, float, float]]:
+		"""Direction, angles intérieur et extérieur du cône éclairé, None pour une lumière omnidirectionnelle."""
+		return None
+
 	def getAttenuationFactor(self, intersection: glm.vec3) -> float:
 		distance = glm.length(self.origin - intersection) # Distance entre la lumière et le point d'intersection
 
 		return 1.0 / (1.0 + 0.09 * distance + 0.032 * distance ** 2) # Atténuation quadratique
 	
-	def isInShadow(self, intersection: glm.vec3, objects: List[Object]) -> bool:
+	def isInShadow(self, intersection: glm.vec3, scene: "Scene") -> bool:
 		direction = self.origin - intersection
 		distance = glm.length(direction)
 		direction = glm.normalize(direction)
@@ -65,10 +96,170 @@ class Light:
 		
 		ray = Ray(shadowRayOrigin, direction)
 		
-		for object in objects:
-			t = object.hit(ray)
+		# Un objet plus proche que la lumière bloque la lumière
+		return scene.occluded(ray, distance, self)
+
+class LightTable:
+	"""
+	Lumières d'une scène sous forme de tableaux parallèles (une ligne par lumière), pour évaluer toutes les lumières
+	en une passe vectorisée. Les lumières omnidirectionnelles ont un cône de cosinus -2: tous les points y sont.
+	Un LightBVH sur leurs zones d'influence (rayon où l'éclairage passe sous cutoff, limité au cône des spots) écarte
+	les lumières trop faibles ou hors cône avant tout rayon d'ombre.
+	"""
+	def __init__(self, lights: list[Light], cutoff: float = LIGHT_CUTOFF) -> None:
+		self.lights = list(lights)
+		self.origins = np.array([tuple(light.origin) for light in lights], dtype=np.float64).reshape(-1, 3)
+		self.colors = np.array([tuple(light.color) for light in lights], dtype=np.float64).reshape(-1, 3)
+		self.intensities = np.array([light.intensity for light in lights], dtype=np.float64)
+
+		cones = [light.cone() for light in lights]
+		self.directions = np.array([(0.0, 0.0, 0.0) if cone is None else tuple(cone[0]) for cone in cones], dtype=np.float64).reshape(-1, 3)
+		self.angles = np.array([0.0 if cone is None else cone[1] for cone in cones], dtype=np.float64)
+		self.outerAngles = np.array([np.pi if cone is None else cone[2] for cone in cones], dtype=np.float64)
+		self.cosAngles = np.where([cone is None for cone in cones], -2.0, np.cos(self.angles))
+		self.cosOuterAngles = np.where([cone is None for cone in cones], -2.0, np.cos(self.outerAngles))
+
+		# Puissance maximale (intensité fois la composante la plus forte de la couleur) et rayon d'influence
+		self.powers = self.intensities * self.colors.max(axis=1, initial=0.0)
+		self.radii = influenceRadius(self.powers, cutoff)
+		self.bvh = LightBVH(self.origins, self.directions, self.outerAngles, self.radii)
+
+	def __len__(self) -> int:
+		return len(self.intensities)
+
+	def evaluate(self, scene: "Scene", materials: MaterialTable, intersections: np.ndarray, normals: np.ndarray, viewDirs: np.ndarray, samples: Optional[int] = None, seed: int = 0) -> np.ndarray:
+		"""
+		Somme des contributions (Blinn-Phong, ombres, atténuation, cône des spots) des lumières en des points (N,3),
+		materials donnant le matériau de chaque point. Équivalent à la somme des getContribution de chaque lumière,
+		aux lumières sous cutoff près. Avec samples, un point éclairé par plus de samples lumières n'en évalue que samples,
+		tirées selon leur contribution estimée (voir sample).
+		"""
+		contributions = np.zeros(intersections.shape, dtype=np.float64)
+
+		if len(self) == 0:
+			return contributions
+
+		# Les tableaux (points, lumières) sont bornés à PACKET_SIZE éléments
+		step = max(1, PACKET_SIZE // len(self))
+
+		for start in range(0, len(intersections), step):
+			chunk = slice(start, start + step)
+			contributions[chunk] = self.evaluateChunk(scene, materials[chunk], intersections[chunk], normals[chunk], viewDirs[chunk], samples, seed)
+
+		return contributions
+
+	def evaluateChunk(self, scene: "Scene", materials: MaterialTable, intersections: np.ndarray, normals: np.ndarray, viewDirs: np.ndarray, samples: Optional[int], seed: int) -> np.ndarray:
+		contributions = np.zeros(intersections.shape, dtype=np.float64)
+
+		# Couples (point, lumière) dont la zone d'influence contient le point
+		points, lights = self.bvh.query(intersections)
+
+		toLight = self.origins[lights] - intersections[points]
+		distance = np.linalg.norm(toLight, axis=1)
+		Dl = toLight / distance[:, None]
+
+		# Cône des spots en espace cosinus: arccos seulement pour les points de la pénombre
+		cos_angle = -np.einsum("ij,ij->i", Dl, self.directions[lights])
+		inside = (cos_angle >= self.cosOuterAngles[lights]) & (distance <= self.radii[lights])
+		points, lights, Dl, distance, cos_angle = points[inside], lights[inside], Dl[inside], distance[inside], cos_angle[inside]
+
+		factor = np.ones(len(points))
+		penumbra = cos_angle < self.cosAngles[lights]
+
+		if penumbra.any():
+			angle = np.arccos(np.clip(cos_angle[penumbra], -1.0, 1.0))
+			inner, outer = self.angles[lights[penumbra]], self.outerAngles[lights[penumbra]]
+			factor[penumbra] = 1.0 - (angle - inner) / (outer - inner)
+
+		attenuation = 1.0 / (1.0 + 0.09 * distance + 0.032 * distance ** 2)
+
+		if samples is not None:
+			chosen, weights = self.sample(intersections, points, lights, self.powers[lights] * attenuation * factor, samples, seed)
+			points, lights, Dl, distance, attenuation, factor = points[chosen], lights[chosen], Dl[chosen], distance[chosen], attenuation[chosen], factor[chosen] * weights
+
+		if not len(points):
+			return contributions
+
+		# Rayons d'ombre des couples restants, en un seul paquet
+		lit = ~scene.occludedPacket(intersections[points] + EPSILON * Dl, Dl, distance)
+		points, lights, Dl, attenuation, factor = points[lit], lights[lit], Dl[lit], attenuation[lit], factor[lit]
+
+		normal, material = normals[points], materials[points]
+
+		diffuse_factor = material.diffuse * np.maximum(0, np.einsum("ij,ij->i", normal, Dl)) * self.intensities[lights]
+
+		halfwayDir = Dl + viewDirs[points]
+		halfwayDir /= np.linalg.norm(halfwayDir, axis=1, keepdims=True)
+		specular_factor = material.specular * np.maximum(0, np.einsum("ij,ij->i", normal, halfwayDir)) ** material.shininess * self.intensities[lights]
+
+		contribution = (diffuse_factor[:, None] * material.diffuse_color + specular_factor[:, None] * material.specular_color) * self.colors[lights] * (attenuation * factor)[:, None]
+
+		# Somme par point des contributions de ses lumières
+		for axis in range(3):
+			contributions[:, axis] = np.bincount(points, contribution[:, axis], minlength=len(intersections))
+
+		return contributions
+
+	def sample(self, intersections: np.ndarray, points: np.ndarray, lights: np.ndarray, estimates: np.ndarray, samples: int, seed: int) -> tuple[np.ndarray, np.ndarray]:
+		"""
+		Tirage des lumières des points qui en ont plus de samples: samples tirages avec remise, de probabilité
+		proportionnelle à la contribution estimée (sans ombre ni matériau), chaque tirage étant pondéré par 1 / (samples p).
+		L'estimation reste sans biais. Les tirages hachent la position du point et la graine: le rendu est reproductible,
+		et lightsAt tire les mêmes lumières (candidats dans l'ordre des indices des lumières).
+		Renvoie les indices des couples gardés (répétés s'ils sont tirés plusieurs fois) et leurs poids.
+		"""
+		# Les couples de contribution nulle (bord du cône) n'éclairent pas
+		candidates = np.flatnonzero(estimates > 0)
+		candidates = candidates[np.lexsort((lights[candidates], points[candidates]))]
+		counts = np.bincount(points[candidates], minlength=len(intersections))
+
+		kept = candidates[counts[points[candidates]] <= samples]
+		sampled = candidates[counts[points[candidates]] > samples]
+
+		if not len(sampled):
+			return kept, np.ones(len(kept))
+
+		# Fonction de répartition par point: les couples d'un point sont contigus dans sampled
+		cumulative = np.cumsum(estimates[sampled])
+		owners, first = np.unique(points[sampled], return_index=True)
+		totals = np.bincount(points[sampled], estimates[sampled], minlength=len(intersections))[owners]
+		offsets = np.where(first > 0, cumulative[first - 1], 0.0)
+		last = first + counts[owners] - 1
+
+		draws = np.arange(samples)
+		bits = sampleBits(intersections[owners])
+		u = hashFloats(bits[:, 0, None], bits[:, 1, None], bits[:, 2, None], draws[None, :], seed=seed)
+
+		chosen = np.searchsorted(cumulative, offsets[:, None] + u * totals[:, None], side="right")
+		chosen = np.minimum(np.maximum(chosen, first[:, None]), last[:, None]).ravel()
+		weights = np.repeat(totals, samples) / (samples * estimates[sampled[chosen]])
+
+		return np.concatenate((kept, sampled[chosen])), np.concatenate((np.ones(len(kept)), weights))
+
+	def lightsAt(self, intersection: glm.vec3, samples: Optional[int] = None, seed: int = 0) -> list[tuple[Light, float]]:
+		"""
+		Version scalaire de la sélection d'evaluate: lumières à évaluer en un point avec getContribution, et leur poids.
+		Sans tirage, le cône des spots est laissé à getContribution, qui le teste avant le rayon d'ombre.
+		"""
+		point = tuple(intersection)
+		candidates = sorted(i for i in self.bvh.queryPoint(point) if glm.distance(self.lights[i].origin, intersection) <= self.radii[i])
+
+		if samples is None or len(candidates) <= samples:
+			return [(self.lights[i], 1.0) for i in candidates]
+
+		estimates = [self.powers[i] * self.lights[i].getAttenuationFactor(intersection) * self.lights[i].coneFactor(intersection) for i in candidates]
+		candidates, estimates = [i for i, e in zip(candidates, estimates) if e > 0], [e for e in estimates if e > 0]
+
+		if len(candidates) <= samples:
+			return [(self.lights[i], 1.0) for i in candidates]
+
+		total = sum(estimates)
+		cumulative = list(itertools.accumulate(estimates))
+		bits = sampleBit(point)
+		selected = []
+
+		for draw in range(samples):
+			k = min(bisect.bisect_right(cumulative, hashFloat(*bits, draw, seed=seed) * total), len(candidates) - 1)
+			selected.append((self.lights[candidates[k]], total / (samples * estimates[k])))
 
-			if t is not None and t < distance:
-				return True # L'objet bloque la lumière
-			
-		return False
\ No newline at end of file
+		return selected
@@ -0,0 +1,105 @@
+import numpy as np
+
+from classes.objects.bvh import build_bvh
+
+def influenceRadius(powers: np.ndarray, cutoff: float) -> np.ndarray:
+	"""
+	Distance à partir de laquelle une lumière de puissance intensité * max(couleur) éclaire moins que cutoff, avec
+	l'atténuation quadratique de Light.getAttenuationFactor: solution de 0.032 d² + 0.09 d + 1 = puissance / cutoff.
+	Infinie si cutoff est nul (pas d'élagage), nulle si la lumière n'atteint jamais cutoff.
+	"""
+	if cutoff <= 0:
+		return np.full(len(powers), np.inf)
+
+	c = 1.0 - np.asarray(powers, dtype=np.float64) / cutoff
+	return np.maximum((-0.09 + np.sqrt(np.maximum(0.09 ** 2 - 4 * 0.032 * c, 0.0))) / (2 * 0.032), 0.0)
+
+def coneBounds(origins: np.ndarray, directions: np.ndarray, outerAngles: np.ndarray, radii: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+	"""
+	Boîtes (L,3) englobant la zone d'influence de chaque lumière: la boule de rayon radii, limitée au cône d'axe
+	directions et de demi-angle outerAngles (pi pour une lumière omnidirectionnelle).
+	Sur chaque axe, la composante maximale d'une direction du cône est cos(max(0, angle(axe, direction) - demi-angle)).
+	"""
+	axes = np.arccos(np.clip(directions, -1.0, 1.0))
+	opposite = np.arccos(np.clip(-directions, -1.0, 1.0))
+
+	high = np.cos(np.maximum(0.0, axes - outerAngles[:, None]))
+	low = -np.cos(np.maximum(0.0, opposite - outerAngles[:, None]))
+
+	# Le sommet du cône (la lumière) fait partie de la zone
+	return origins + radii[:, None] * np.minimum(low, 0.0), origins + radii[:, None] * np.maximum(high, 0.0)
+
+class LightBVH:
+	"""
+	BVH sur les zones d'influence des lumières, interrogé avec des points: renvoie les lumières dont la boîte contient
+	chaque point. Les lumières de rayon infini sont gardées à part et renvoyées pour tous les points.
+	"""
+	leafSize = 4
+
+	def __init__(self, origins: np.ndarray, directions: np.ndarray, outerAngles: np.ndarray, radii: np.ndarray) -> None:
+		bounded = np.isfinite(radii)
+
+		self.unbounded = np.flatnonzero(~bounded)
+		self.bounded = np.flatnonzero(bounded)
+		self._unbounded = self.unbounded.tolist()
+		self._nodes = []
+		self._order = []
+
+		if len(self.bounded):
+			boundsMin, boundsMax = coneBounds(origins[bounded], directions[bounded], outerAngles[bounded], radii[bounded])
+
+			self.nodesMin, self.nodesMax, self.nodesStart, self.nodesCount, self.order = build_bvh(boundsMin, boundsMax, self.leafSize)
+			self.order = self.bounded[self.order]
+			self._nodes = list(zip(map(tuple, self.nodesMin.tolist()), map(tuple, self.nodesMax.tolist()), self.nodesStart.tolist(), self.nodesCount.tolist()))
+			self._order = self.order.tolist()
+
+	def query(self, points: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+		"""Couples (indice du point, indice de la lumière) dont la zone d'influence peut contenir le point."""
+		pointIndices, lightIndices = [], []
+
+		if len(self.unbounded):
+			pointIndices.append(np.repeat(np.arange(len(points)), len(self.unbounded)))
+			lightIndices.append(np.tile(self.unbounded, len(points)))
+
+		stack = [(0, np.arange(len(points)))] if self._nodes else []
+
+		while stack:
+			node, inside = stack.pop()
+			inside = inside[((points[inside] >= self.nodesMin[node]) & (points[inside] <= self.nodesMax[node])).all(axis=1)]
+
+			if len(inside) == 0:
+				continue
+
+			if self.nodesCount[node] > 0:
+				lights = self.order[self.nodesStart[node]:self.nodesStart[node] + self.nodesCount[node]]
+				pointIndices.append(np.repeat(inside, len(lights)))
+				lightIndices.append(np.tile(lights, len(inside)))
+				continue
+
+			stack.append((self.nodesStart[node], inside))
+			stack.append((node + 1, inside))
+
+		if not pointIndices:
+			return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+
+		return np.concatenate(pointIndices), np.concatenate(lightIndices)
+
+	def queryPoint(self, point: tuple[float, float, float]) -> list[int]:
+		"""Version scalaire de query pour un seul point, en Python pur."""
+		lights = list(self._unbounded)
+		stack = [0] if self._nodes else []
+
+		while stack:
+			node = stack.pop()
+			boxMin, boxMax, start, count = self._nodes[node]
+
+			if not (boxMin[0] <= point[0] <= boxMax[0] and boxMin[1] <= point[1] <= boxMax[1] and boxMin[2] <= point[2] <= boxMax[2]):
+				continue
+
+			if count > 0:
+				lights.extend(self._order[start:start + count])
+			else:
+				stack.append(start)
+				stack.append(node + 1)
+
+		return lights
@@ -2,9 +2,12 @@ from pyglm import glm
 from glm import vec3
 from classes.lights.light import Light
 from classes.objects.object import Object
-from typing import List, Optional
+from typing import TYPE_CHECKING, Optional
 import math
 
+if TYPE_CHECKING:
+	from classes.scene import Scene
+
 
 class SpotLight(Light):
 	direction: vec3
@@ -18,28 +21,42 @@ class SpotLight(Light):
 		self.angle = angle  # L'angle du cône intérieur
 		self.outer_angle = outer_angle if outer_angle else angle * 1.2 # L'angle du cône extérieur
 
-	def getContribution(self, objects: List[Object], object: Object, intersection: vec3, viewDir: vec3) -> vec3:
+		# Cosinus des angles du cône: le test d'appartenance se fait sans arccos
+		self.cos_angle = math.cos(self.angle)
+		self.cos_outer_angle = math.cos(self.outer_angle)
+
+	def cone(self) -> tuple[vec3, float, float]:
+		return self.direction, self.angle, self.outer_angle
+
+	def coneFactor(self, intersection: vec3) -> float:
 		# Calculer la direction du spot vers le point d'intersection
 		light_to_point = glm.normalize(intersection - self.origin)
 		
 		# Calculer l'angle entre la direction du spot et la direction vers le point
 		cos_angle = glm.dot(light_to_point, self.direction)
-		current_angle = math.acos(max(-1.0, min(1.0, cos_angle)))
 		
 		# Pas de lumière si en dehors du cone exterieur
-		if current_angle > self.outer_angle:
-			return glm.vec3(0, 0, 0)
+		if cos_angle < self.cos_outer_angle:
+			return 0.0
 		
 		# Dégradé si c'est en dehors du cone interne
-		if current_angle > self.angle:
-			# Interpolation
-			factor = 1.0 - (current_angle - self.angle) / (self.outer_angle - self.angle)
-		else:
-			# Luminosité complete
-			factor = 1.0
+		if cos_angle < self.cos_angle:
+			# Interpolation (l'angle n'est calculé que dans la pénombre)
+			current_angle = math.acos(max(-1.0, min(1.0, cos_angle)))
+			return 1.0 - (current_angle - self.angle) / (self.outer_angle - self.angle)
+
+		# Luminosité complete
+		return 1.0
+
+	def getContribution(self, scene: "Scene", object: Object, intersection: vec3, normal: vec3, viewDir: vec3) -> vec3:
+		factor = self.coneFactor(intersection)
+
+		# Pas de lumière (ni de rayon d'ombre) en dehors du cone exterieur
+		if factor == 0.0:
+			return glm.vec3(0, 0, 0)
 		
 		# Get base contribution from parent (handles shadows, diffuse, specular)
-		contribution = super().getContribution(objects, object, intersection, viewDir)
+		contribution = super().getContribution(scene, object, intersection, normal, viewDir)
 		
 		# Apply cone falloff
-		return contribution * factor
\ No newline at end of file
+		return contribution * factor
@@ -1,7 +1,10 @@
 from typing import Optional
 from pyglm import glm
+import numpy as np
 
 class Material:
+	__slots__ = ("diffuse_color", "specular_color", "diffuse", "specular", "shininess", "reflectivity", "refractivity", "IOR")
+
 	diffuse_color: glm.vec3
 	specular_color: glm.vec3
 	diffuse: float # Reflexion diffuse entre 0 et 1 (Kd)
@@ -61,4 +64,37 @@ class Material:
 			raise ValueError("Materials cannot be both refractive and reflective - use refractivity for glass (Fresnel handles reflection)")
 
 	def clone(self) -> "Material":
-		return Material(self.diffuse_color, self.specular_color, self.specular, self.diffuse, self.shininess, self.reflectivity, self.refractivity, self.IOR)
\ No newline at end of file
+		return Material(self.diffuse_color, self.specular_color, self.specular, self.diffuse, self.shininess, self.reflectivity, self.refractivity, self.IOR)
+
+class MaterialTable:
+	"""
+	Matériaux sous forme de tableaux parallèles, une ligne par matériau: diffuse_color, specular_color (M,3) et
+	diffuse, specular, shininess, reflectivity, refractivity, IOR (M,). Indexer la table par un tableau d'identifiants
+	(table[ids]) renvoie la table des lignes correspondantes, par exemple les paramètres de chaque rayon d'un paquet.
+	"""
+	FIELDS = ("diffuse_color", "specular_color", "diffuse", "specular", "shininess", "reflectivity", "refractivity", "IOR")
+	__slots__ = FIELDS
+
+	def __init__(self, **columns: np.ndarray) -> None:
+		for name in self.FIELDS:
+			setattr(self, name, columns[name])
+
+	@staticmethod
+	def compile(materials: list[Material]) -> "MaterialTable":
+		columns = {}
+
+		for name in MaterialTable.FIELDS:
+			values = [getattr(material, name) for material in materials]
+
+			if name.endswith("color"):
+				columns[name] = np.array([tuple(value) for value in values], dtype=np.float64).reshape(-1, 3)
+			else:
+				columns[name] = np.array(values, dtype=np.float64)
+
+		return MaterialTable(**columns)
+
+	def __len__(self) -> int:
+		return len(self.diffuse)
+
+	def __getitem__(self, ids: np.ndarray) -> "MaterialTable":
+		return MaterialTable(**{name: getattr(self, name)[ids] for name in self.FIELDS})
@@ -1,59 +1,129 @@
 from classes.objects.triangle import Triangle
 from pyglm import glm
+import numpy as np
+
+def as_matrix(matrix) -> np.ndarray:
+    """Convertit une glm.mat4 (stockée par colonnes) ou un tableau 4x4 en matrice NumPy (4,4) float64."""
+    if isinstance(matrix, glm.mat4):
+        return np.array(matrix.to_list(), dtype=np.float64).T
+
+    return np.asarray(matrix, dtype=np.float64).reshape(4, 4)
+
+def translation_matrix(translation_vector) -> np.ndarray:
+    matrix = np.eye(4)
+    matrix[:3, 3] = tuple(translation_vector)
+    return matrix
+
+def scale_matrix(scale_factor, center=None) -> np.ndarray:
+    """
+    Matrice de mise à l'échelle.
+    - scale_factor: scalaire (Python ou NumPy, uniforme) ou glm.vec3.
+    - center: glm.vec3 optionnel, point fixe de la mise à l'échelle. Par défaut l'origine.
+    """
+    if np.ndim(scale_factor) == 0:
+        scale_factor = (scale_factor, scale_factor, scale_factor)
+
+    matrix = np.diag([*map(float, tuple(scale_factor)), 1.0])
+    return around(matrix, center)
+
+def rotation_matrix(x: float, y: float, z: float, center=None) -> np.ndarray:
+    """
+    Matrice de rotation autour des axes X, Y et Z (ordre ZYX).
+    - x, y, z: angles en degrés.
+    - center: glm.vec3 optionnel, point fixe de la rotation. Par défaut l'origine.
+    """
+    # Convertir les angles en radians
+    ax = glm.radians(x)
+    ay = glm.radians(y)
+    az = glm.radians(z)
+
+    # Matrices de rotation
+    Rx = glm.mat3(
+        1, 0, 0,
+        0, glm.cos(ax), -glm.sin(ax),
+        0, glm.sin(ax), glm.cos(ax)
+    )
+
+    Ry = glm.mat3(
+        glm.cos(ay), 0, glm.sin(ay),
+        0, 1, 0,
+        -glm.sin(ay), 0, glm.cos(ay)
+    )
+
+    Rz = glm.mat3(
+        glm.cos(az), -glm.sin(az), 0,
+        glm.sin(az), glm.cos(az), 0,
+        0, 0, 1
+    )
+
+    R = Rz * Ry * Rx  # Ordre des rotations ZYX
+
+    return around(as_matrix(glm.mat4(R)), center)
+
+def around(matrix: np.ndarray, center=None) -> np.ndarray:
+    """Applique la matrice autour de center plutôt qu'autour de l'origine."""
+    if center is None:
+        return matrix
+
+    return translation_matrix(center) @ matrix @ translation_matrix(-glm.vec3(center))
 
 class Model():
+    """
+    Maillage stocké dans des tableaux NumPy: vertices (N,3) float32 et faces (M,3) int32.
+    Les transformations s'appliquent à tous les sommets en une opération matricielle, et les triangles
+    (Triangle) ne sont créés qu'à la première utilisation de `triangles`.
+    """
     def __init__(self, vertices, faces):
-        self.vertices = vertices
-        self.faces = faces
-        self.triangles = []
+        if not isinstance(vertices, np.ndarray):
+            vertices = [tuple(v) for v in vertices]
+
+        self.vertices = np.array(vertices, dtype=np.float32).reshape(-1, 3)
+        self.faces = np.array(faces, dtype=np.int32).reshape(-1, 3)
+        self._triangles = None
+
+    @property
+    def triangles(self):
+        if self._triangles is None:
+            self.generate_triangles()
+        return self._triangles
+
+    @triangles.setter
+    def triangles(self, triangles):
+        self._triangles = triangles
 
     def generate_triangles(self):
         list_of_triangles = []
-        for f in self.faces:
-            v0 = self.vertices[f[0]]
-            v1 = self.vertices[f[1]]
-            v2 = self.vertices[f[2]]
-            triangle = Triangle(v0, v1, v2)
+        for v0, v1, v2 in self.vertices[self.faces].tolist():
+            triangle = Triangle(glm.vec3(v0), glm.vec3(v1), glm.vec3(v2))
             list_of_triangles.append(triangle)
-        self.triangles =  list_of_triangles
+        self._triangles = list_of_triangles
 
     def barycentre(self):
-        barycentre = glm.vec3(0.0)
-        for v in self.vertices:
-            barycentre += v
-        barycentre /= len(self.vertices)
-        return barycentre
-    
+        return glm.vec3(*self.vertices.mean(axis=0, dtype=np.float64))
+
+    def bounds(self):
+        """Renvoie les coins (min, max) de la boîte englobante des sommets."""
+        return glm.vec3(*self.vertices.min(axis=0)), glm.vec3(*self.vertices.max(axis=0))
+
+    def transform(self, matrix) -> None:
+        """Applique une transformation affine 4x4 (glm.mat4 ou tableau NumPy, composables par produit) à tous les sommets."""
+        matrix = as_matrix(matrix)
+        self.vertices = (self.vertices @ matrix[:3, :3].T + matrix[:3, 3]).astype(np.float32)
+        self._triangles = None  # Les triangles seront recréés avec les nouveaux sommets
+
     def translate(self, translation_vector: glm.vec3) -> None:
-        for i in range(len(self.vertices)):
-            self.vertices[i] += translation_vector
-    
+        self.transform(translation_matrix(translation_vector))
+
     def scale(self, scale_factor: float) -> None:
-        for i in range(len(self.vertices)):
-            self.vertices[i] *= scale_factor
-    
+        self.transform(scale_matrix(scale_factor))
+
     def scale_uniform(self, scale_factor, center=None):
         """
         Scale uniformément le modèle.
         - scale_factor: scalaire ou glm.vec3 (si scalaire, uniforme).
         - center: glm.vec3 optionnel, point autour duquel scaler. Par défaut le barycentre.
         """
-        # normaliser scale_factor en vec3
-        if isinstance(scale_factor, (int, float)):
-            s = glm.vec3(float(scale_factor), float(scale_factor), float(scale_factor))
-        else:
-            s = glm.vec3(scale_factor)
-
-        if center is None:
-            center = self.barycentre()
-        else:
-            center = glm.vec3(center)
-
-        for i in range(len(self.vertices)):
-            v = glm.vec3(self.vertices[i])
-            # translation au centre, scale, puis retour
-            self.vertices[i] = center + (v - center) * s
-
+        self.transform(scale_matrix(scale_factor, self.barycentre() if center is None else center))
 
     def rotate(self, x: float, y: float, z: float, center=None):
         """
@@ -61,38 +131,4 @@ class Model():
         - x, y, z: angles en degrés.
         - center: glm.vec3 optionnel, point autour duquel tourner. Par défaut le barycentre.
         """
-        if center is None:
-            center = self.barycentre()
-        else:
-            center = glm.vec3(center)
-
-        # Convertir les angles en radians
-        ax = glm.radians(x)
-        ay = glm.radians(y)
-        az = glm.radians(z)
-
-        # Matrices de rotation
-        Rx = glm.mat3(
-            1, 0, 0,
-            0, glm.cos(ax), -glm.sin(ax),
-            0, glm.sin(ax), glm.cos(ax)
-        )
-
-        Ry = glm.mat3(
-            glm.cos(ay), 0, glm.sin(ay),
-            0, 1, 0,
-            -glm.sin(ay), 0, glm.cos(ay)
-        )
-
-        Rz = glm.mat3(
-            glm.cos(az), -glm.sin(az), 0,
-            glm.sin(az), glm.cos(az), 0,
-            0, 0, 1
-        )
-
-        R = Rz * Ry * Rx  # Ordre des rotations ZYX
-
-        for i in range(len(self.vertices)):
-            v = glm.vec3(self.vertices[i])
-            # translation au centre, rotation, puis retour
-            self.vertices[i] = center + R * (v - center)
\ No newline at end of file
+        self.transform(rotation_matrix(x, y, z, self.barycentre() if center is None else center))
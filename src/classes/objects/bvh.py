@@ -0,0 +1,671 @@
+from typing import Optional
+from pyglm import glm
+import hashlib
+import json
+import os
+import numpy as np
+
+from classes.material import Material
+from classes.hit import Hit
+from classes.objects.object import Object
+from classes.model import Model
+from classes.objects.triangle import intersect_triangles, pack_triangles, closest_triangle, any_triangle, cross
+from constants import EPSILON
+from utils.cache import read_arrays, write_arrays
+
+def surface_area(box_min, box_max):
+    """Surface area of one or many (..., 3) boxes."""
+    extent = np.maximum(box_max - box_min, 0.0)
+    return 2.0 * (extent[..., 0] * extent[..., 1] + extent[..., 1] * extent[..., 2] + extent[..., 2] * extent[..., 0])
+
+def build_bvh(bounds_min, bounds_max, leaf_size=8, bins=16, traversal_cost=1.0, intersection_cost=0.25):
+    """
+    Build a BVH over n primitives given their (n,3) bounding boxes, with the binned surface area heuristic.
+    The tree is returned as flat arrays in depth-first order, so the left child of an internal node is the next node:
+    - nodes_min, nodes_max: (N,3) node bounding boxes.
+    - nodes_start: index of the right child for internal nodes, first primitive in `order` for leaves.
+    - nodes_count: number of primitives of leaves, 0 for internal nodes.
+    - order: primitive indices, each leaf owns the contiguous range order[start:start + count].
+    The default costs favour slightly larger leaves, since leaf triangles are tested in a single vectorized call.
+    """
+    centroids = (bounds_min + bounds_max) * 0.5
+    order = np.arange(len(bounds_min), dtype=np.int64)
+
+    nodes_min, nodes_max, nodes_start, nodes_count = [], [], [], []
+
+    # (first primitive, end, parent waiting for its right child index or -1)
+    stack = [(0, len(order), -1)]
+
+    while stack:
+        start, end, parent = stack.pop()
+        node = len(nodes_min)
+
+        if parent >= 0:
+            nodes_start[parent] = node
+
+        primitives = order[start:end]
+        box_min = bounds_min[primitives].min(axis=0) if len(primitives) else np.zeros(3)
+        box_max = bounds_max[primitives].max(axis=0) if len(primitives) else np.zeros(3)
+
+        nodes_min.append(box_min)
+        nodes_max.append(box_max)
+        nodes_start.append(start)
+        nodes_count.append(end - start)
+
+        if end - start <= 1:
+            continue
+
+        split = _find_split(bounds_min[primitives], bounds_max[primitives], centroids[primitives], box_min, box_max, bins, traversal_cost, intersection_cost)
+
+        if split is None:
+            if end - start <= leaf_size:
+                continue
+
+            # No useful split but too many primitives for a leaf: split at the median of the widest axis
+            axis = int(np.argmax(box_max - box_min))
+            left = np.zeros(end - start, dtype=bool)
+            left[np.argsort(centroids[primitives, axis], kind="stable")[:(end - start) // 2]] = True
+
+        else:
+            left, cost = split
+
+            # Keep the primitives in a leaf when splitting doesn't pay off
+            if end - start <= leaf_size and cost >= (end - start) * intersection_cost:
+                continue
+
+        order[start:end] = np.concatenate((primitives[left], primitives[~left]))
+        middle = start + int(left.sum())
+
+        nodes_count[node] = 0
+        # The left child is pushed last so that it is built right after its parent
+        stack.append((middle, end, node))
+        stack.append((start, middle, -1))
+
+    return (
+        np.array(nodes_min, dtype=np.float64).reshape(-1, 3),
+        np.array(nodes_max, dtype=np.float64).reshape(-1, 3),
+        np.array(nodes_start, dtype=np.int64),
+        np.array(nodes_count, dtype=np.int64),
+        order,
+    )
+
+def _find_split(bounds_min, bounds_max, centroids, box_min, box_max, bins, traversal_cost, intersection_cost):
+    """Return (left mask, SAH cost) of the best binned split of a node, or None if the centroids can't be separated."""
+    centroid_min = centroids.min(axis=0)
+    centroid_extent = centroids.max(axis=0) - centroid_min
+    parent_area = surface_area(box_min, box_max)
+
+    best = None
+
+    for axis in range(3):
+        if centroid_extent[axis] <= 0.0:
+            continue
+
+        bin_ids = ((centroids[:, axis] - centroid_min[axis]) / centroid_extent[axis] * bins).astype(np.int64)
+        np.clip(bin_ids, 0, bins - 1, out=bin_ids)
+
+        # Bounds and counts of every bin, through a sort + reduceat instead of a Python loop
+        sort = np.argsort(bin_ids, kind="stable")
+        sorted_ids = bin_ids[sort]
+        used, first = np.unique(sorted_ids, return_index=True)
+
+        bin_min = np.full((bins, 3), np.inf)
+        bin_max = np.full((bins, 3), -np.inf)
+        bin_min[used] = np.minimum.reduceat(bounds_min[sort], first, axis=0)
+        bin_max[used] = np.maximum.reduceat(bounds_max[sort], first, axis=0)
+        counts = np.bincount(bin_ids, minlength=bins)
+
+        # Sweep from both sides: split k puts bins [0, k] on the left
+        left_counts = np.cumsum(counts)[:-1]
+        right_counts = np.cumsum(counts[::-1])[::-1][1:]
+        left_area = surface_area(np.minimum.accumulate(bin_min)[:-1], np.maximum.accumulate(bin_max)[:-1])
+        right_area = surface_area(np.minimum.accumulate(bin_min[::-1])[::-1][1:], np.maximum.accumulate(bin_max[::-1])[::-1][1:])
+
+        with np.errstate(invalid="ignore"):
+            costs = traversal_cost + intersection_cost * (left_area * left_counts + right_area * right_counts) / max(parent_area, 1e-30)
+
+        costs[(left_counts == 0) | (right_counts == 0)] = np.inf
+        k = int(np.argmin(costs))
+
+        if np.isfinite(costs[k]) and (best is None or costs[k] < best[2]):
+            best = (axis, bin_ids, costs[k], k)
+
+    if best is None:
+        return None
+
+    _, bin_ids, cost, k = best
+
+    return bin_ids <= k, float(cost)
+
+def slab(origin, inverse, box_min, box_max):
+    """Ray/box slab test with Python floats. Returns the entry distance, or None if the box is missed."""
+    tmin = 0.0
+    tmax = float("inf")
+
+    for i in range(3):
+        t1 = (box_min[i] - origin[i]) * inverse[i]
+        t2 = (box_max[i] - origin[i]) * inverse[i]
+
+        if t1 > t2:
+            t1, t2 = t2, t1
+
+        if t1 > tmin:
+            tmin = t1
+        if t2 < tmax:
+            tmax = t2
+
+        if tmin > tmax:
+            return None
+
+    return tmin
+
+def slab_packet(origins, inverses, box_min, box_max):
+    """Vectorized slab test. Returns the entry distances of the rays, inf for the rays missing the box."""
+    t1 = (box_min - origins) * inverses
+    t2 = (box_max - origins) * inverses
+
+    tmin = np.maximum(np.minimum(t1, t2).max(axis=1), 0.0)
+    tmax = np.maximum(t1, t2).min(axis=1)
+
+    return np.where(tmin <= tmax, tmin, np.inf)
+
+def inverse_direction(direction):
+    """Per-axis inverse of a direction, with a huge value instead of a division by zero for parallel axes."""
+    return tuple(1.0 / d if d != 0.0 else 1e30 for d in direction)
+
+class BVH(Object):
+    """
+    Bounding volume hierarchy over the triangles of a model, built with the surface area heuristic.
+    Same interface as Octree: the tree is stored in flat arrays and traversed front-to-back,
+    skipping the nodes farther than the closest hit found so far.
+    """
+    model = None
+    leaf_size = 8
+
+    # Maximum number of ray/triangle pairs tested at once in a leaf, bounds the packet memory usage
+    packet_pairs = 1 << 18
+
+    # Bump when build_bvh or the layout of the cached arrays changes, so that older cache files are ignored
+    cache_version = 1
+
+    def __init__(self, model: Model, material: Optional[Material]=None, leaf_size: Optional[int]=None, cache: Optional[str]=None):
+        """
+        Build the BVH over the faces of the model. With cache, a directory, the built tree is saved there and
+        memory-mapped back by the next BVH built over the same transformed triangles with the same parameters.
+        """
+        super().__init__(material)
+
+        self.model = model
+
+        if leaf_size is not None:
+            self.leaf_size = leaf_size
+
+        # The triangles are read from the vertex/face arrays, the model's Triangle objects are never created
+        vertices = self.model.vertices[self.model.faces].astype(np.float64)
+        self.v0 = vertices[:, 0]
+        self.edge1 = vertices[:, 1] - vertices[:, 0]
+        self.edge2 = vertices[:, 2] - vertices[:, 0]
+        normals = cross(self.edge1, self.edge2)
+        self.normals = normals / np.linalg.norm(normals, axis=1, keepdims=True)
+
+        tree = self.load(cache, vertices) if cache else None
+
+        if tree is None:
+            tree = build_bvh(vertices.min(axis=1), vertices.max(axis=1), self.leaf_size)
+
+            if cache:
+                self.save(cache, vertices, tree)
+
+        self.nodes_min, self.nodes_max, self.nodes_start, self.nodes_count, self.order = tree
+        self.pack_leaves()
+
+        # A model without faces builds a single empty root, which would be traversed as an internal node
+        self.empty = len(self.order) == 0
+
+    def cache_parameters(self, vertices):
+        """Everything the built tree depends on. The vertices are already transformed, their hash covers the transform."""
+        return {
+            "version": self.cache_version,
+            "leaf_size": self.leaf_size,
+            "triangles": len(vertices),
+            "hash": hashlib.blake2b(np.ascontiguousarray(vertices).tobytes(), digest_size=16).hexdigest(),
+        }
+
+    def cache_file(self, cache, parameters):
+        key = hashlib.blake2b(json.dumps(parameters, sort_keys=True).encode(), digest_size=16).hexdigest()
+        return os.path.join(cache, f"{key}.bvh")
+
+    def load(self, cache, vertices):
+        """Returns the memory-mapped tree arrays cached for these triangles, or None."""
+        parameters = self.cache_parameters(vertices)
+        cached = read_arrays(self.cache_file(cache, parameters))
+
+        if cached is None or cached[0] != parameters:
+            return None
+
+        arrays = cached[1]
+        return arrays["nodes_min"], arrays["nodes_max"], arrays["nodes_start"], arrays["nodes_count"], arrays["order"]
+
+    def save(self, cache, vertices, tree):
+        parameters = self.cache_parameters(vertices)
+        write_arrays(self.cache_file(cache, parameters), parameters, dict(zip(("nodes_min", "nodes_max", "nodes_start", "nodes_count", "order"), tree)))
+
+    def pack_leaves(self):
+        """Prepare the per-node data used by the traversals: Python tuples for the scalar one, packed triangles for the leaves."""
+        self._nodes = list(zip(map(tuple, self.nodes_min.tolist()), map(tuple, self.nodes_max.tolist()), self.nodes_start.tolist(), self.nodes_count.tolist()))
+        self._leaves = {}
+
+        for node in np.flatnonzero(self.nodes_count > 0).tolist():
+            indices = self.order[self.nodes_start[node]:self.nodes_start[node] + self.nodes_count[node]]
+            self._leaves[node] = (indices, self.v0[indices], self.edge1[indices], self.edge2[indices], pack_triangles(self.v0[indices], self.edge1[indices], self.edge2[indices]))
+
+    @property
+    def min(self):
+        return glm.vec3(*self.nodes_min[0])
+
+    @property
+    def max(self):
+        return glm.vec3(*self.nodes_max[0])
+
+    def hit(self, ray):
+        """Returns the hit record of the closest triangle, or None if no hit."""
+        closest = self._traverse(ray)
+        if closest is None:
+            return None
+
+        t, triangle, u, v = closest
+        return Hit(t, glm.vec3(*self.normals[triangle]), triangle, u, v)
+
+    def _traverse(self, ray):
+        """Front-to-back traversal, returns (t, triangle index, u, v) of the closest hit or None."""
+        if self.empty:
+            return None
+
+        origin = tuple(ray.origin)
+        direction = tuple(ray.direction)
+        inverse = inverse_direction(direction)
+        nodes = self._nodes
+
+        box_min, box_max, _, _ = nodes[0]
+        entry = slab(origin, inverse, box_min, box_max)
+
+        if entry is None:
+            return None
+
+        closest_t = float("inf")
+        closest = None
+        stack = [(entry, 0)]
+
+        while stack:
+            entry, node = stack.pop()
+
+            # Closest-hit pruning: this node starts behind the closest triangle found so far
+            if entry > closest_t:
+                continue
+
+            _, _, start, count = nodes[node]
+
+            if count > 0:
+                indices, _, _, _, packed = self._leaves[node]
+                leaf_hit = closest_triangle(origin, direction, packed, 1e-6)
+
+                if leaf_hit is not None and leaf_hit[0] < closest_t:
+                    t, index, u, v = leaf_hit
+                    closest_t = t
+                    closest = (t, int(indices[index]), u, v)
+
+                continue
+
+            left, right = node + 1, start
+            left_min, left_max, _, _ = nodes[left]
+            right_min, right_max, _, _ = nodes[right]
+            left_entry = slab(origin, inverse, left_min, left_max)
+            right_entry = slab(origin, inverse, right_min, right_max)
+
+            # Push the farthest child first so that the nearest one is visited next
+            if left_entry is not None and right_entry is not None:
+                if left_entry <= right_entry:
+                    stack.append((right_entry, right))
+                    stack.append((left_entry, left))
+                else:
+                    stack.append((left_entry, left))
+                    stack.append((right_entry, right))
+
+            elif left_entry is not None:
+                stack.append((left_entry, left))
+
+            elif right_entry is not None:
+                stack.append((right_entry, right))
+
+        return closest
+
+    def occludes(self, ray, maxDistance):
+        """Any-hit traversal: returns True on the first triangle closer than maxDistance."""
+        if self.empty:
+            return False
+
+        origin = tuple(ray.origin)
+        direction = tuple(ray.direction)
+        inverse = inverse_direction(direction)
+        nodes = self._nodes
+        stack = [0]
+
+        while stack:
+            node = stack.pop()
+            box_min, box_max, start, count = nodes[node]
+            entry = slab(origin, inverse, box_min, box_max)
+
+            if entry is None or entry > maxDistance:
+                continue
+
+            if count > 0:
+                if any_triangle(origin, direction, self._leaves[node][4], 1e-6, maxDistance):
+                    return True
+
+                continue
+
+            stack.append(start)
+            stack.append(node + 1)
+
+        return False
+
+    def occludesPacket(self, origins, directions, maxDistances):
+        occluded = np.zeros(len(directions), dtype=bool)
+
+        if self.empty:
+            return occluded
+
+        inverses = 1.0 / np.where(directions == 0.0, 1e-30, directions)
+        self._occludes_node_packet(0, origins, inverses, directions, maxDistances, np.arange(len(directions)), occluded)
+        return occluded
+
+    def _occludes_node_packet(self, node, origins, inverses, directions, maxDistances, rays, occluded):
+        """Like _hit_node_packet, but the rays leave the traversal as soon as they are occluded."""
+        rays = rays[~occluded[rays]]
+        entry = slab_packet(origins[rays], inverses[rays], self.nodes_min[node], self.nodes_max[node])
+        rays = rays[entry < maxDistances[rays]]
+
+        if len(rays) == 0:
+            return
+
+        if self.nodes_count[node] > 0:
+            _, v0, edge1, edge2, _ = self._leaves[node]
+            chunk = max(1, self.packet_pairs // len(v0))
+
+            for start in range(0, len(rays), chunk):
+                subset = rays[start:start + chunk]
+                t = intersect_triangles(origins[subset], directions[subset], v0, edge1, edge2)
+                occluded[subset] = ((t > 1e-6) & (t < maxDistances[subset, None])).any(axis=1)
+
+            return
+
+        self._occludes_node_packet(node + 1, origins, inverses, directions, maxDistances, rays, occluded)
+        self._occludes_node_packet(self.nodes_start[node], origins, inverses, directions, maxDistances, rays, occluded)
+
+    def hitPacket(self, origins, directions):
+        """Returns closest t distances (inf if no hit) and hit triangle indices for a packet of rays."""
+        distances = np.full(len(directions), np.inf)
+        triangles = np.full(len(directions), -1, dtype=np.int64)
+
+        if self.empty:
+            return distances, triangles
+
+        inverses = 1.0 / np.where(directions == 0.0, 1e-30, directions)
+
+        self._hit_node_packet(0, origins, inverses, directions, np.arange(len(directions)), distances, triangles)
+
+        return distances, triangles
+
+    def _hit_node_packet(self, node, origins, inverses, directions, rays, distances, triangles):
+        """Recursively traverse the BVH with the subset of rays that reach each node before their closest hit."""
+        entry = slab_packet(origins[rays], inverses[rays], self.nodes_min[node], self.nodes_max[node])
+
+        rays = rays[entry < distances[rays]]
+
+        if len(rays) == 0:
+            return
+
+        if self.nodes_count[node] > 0:
+            indices, v0, edge1, edge2, _ = self._leaves[node]
+            chunk = max(1, self.packet_pairs // len(indices))
+
+            for start in range(0, len(rays), chunk):
+                subset = rays[start:start + chunk]
+                t = intersect_triangles(origins[subset], directions[subset], v0, edge1, edge2)
+                t[t <= 1e-6] = np.inf
+
+                closest = np.argmin(t, axis=1)
+                closest_t = t[np.arange(len(subset)), closest]
+                better = closest_t < distances[subset]
+
+                distances[subset[better]] = closest_t[better]
+                triangles[subset[better]] = indices[closest[better]]
+
+            return
+
+        self._hit_node_packet(node + 1, origins, inverses, directions, rays, distances, triangles)
+        self._hit_node_packet(self.nodes_start[node], origins, inverses, directions, rays, distances, triangles)
+
+    def getNormalPacket(self, hitPoints, primitives):
+        return self.normals[primitives]
+
+    def boundingBox(self):
+        return self.min, self.max
+
+class TopLevelBVH:
+    """
+    BVH over the bounding boxes of the objects of a scene. Unbounded objects (planes) are kept apart
+    and tested against every ray. Object indices refer to positions in the list given to the constructor.
+    """
+    leaf_size = 2
+
+    def __init__(self, objects):
+        self.objects = list(objects)
+        self.unbounded = []
+        bounded, bounds = [], []
+
+        for i, obj in enumerate(self.objects):
+            box = obj.boundingBox()
+
+            if box is None:
+                self.unbounded.append(i)
+            else:
+                bounded.append(i)
+                bounds.append((tuple(box[0]), tuple(box[1])))
+
+        self.bounded = np.array(bounded, dtype=np.int64)
+        self.nodes_count = np.zeros(0, dtype=np.int64)
+        self._nodes = []
+
+        if bounded:
+            bounds = np.array(bounds, dtype=np.float64)
+
+            # Boxes are padded so that rays grazing flat objects (triangles) still reach them
+            self.nodes_min, self.nodes_max, self.nodes_start, self.nodes_count, self.order = build_bvh(
+                bounds[:, 0] - EPSILON, bounds[:, 1] + EPSILON, self.leaf_size, intersection_cost=1.0
+            )
+            self.order = self.bounded[self.order]
+            self._nodes = list(zip(map(tuple, self.nodes_min.tolist()), map(tuple, self.nodes_max.tolist()), self.nodes_start.tolist(), self.nodes_count.tolist()))
+
+    def intersect(self, ray):
+        """Returns (object index, hit record) of the closest hit, or (None, None)."""
+        closest_t = float("inf")
+        closest_index = None
+        closest_hit = None
+
+        for i in self.unbounded:
+            hit = self.objects[i].hit(ray)
+
+            if hit is not None and 0 < hit.t < closest_t:
+                closest_t = hit.t
+                closest_index = i
+                closest_hit = hit
+
+        if not self._nodes:
+            return closest_index, closest_hit
+
+        origin = tuple(ray.origin)
+        inverse = inverse_direction(tuple(ray.direction))
+        nodes = self._nodes
+
+        box_min, box_max, _, _ = nodes[0]
+        entry = slab(origin, inverse, box_min, box_max)
+        stack = [] if entry is None else [(entry, 0)]
+
+        while stack:
+            entry, node = stack.pop()
+
+            if entry > closest_t:
+                continue
+
+            _, _, start, count = nodes[node]
+
+            if count > 0:
+                for i in self.order[start:start + count].tolist():
+                    hit = self.objects[i].hit(ray)
+
+                    if hit is not None and 0 < hit.t < closest_t:
+                        closest_t = hit.t
+                        closest_index = i
+                        closest_hit = hit
+
+                continue
+
+            for child_entry, child in sorted(self._children(origin, inverse, node), reverse=True):
+                stack.append((child_entry, child))
+
+        return closest_index, closest_hit
+
+    def occluded(self, ray, max_distance):
+        """Returns True as soon as an object is hit closer than max_distance."""
+        return self.occluder(ray, max_distance) is not None
+
+    def occluder(self, ray, max_distance):
+        """Returns the index of the first object found hit closer than max_distance, or None."""
+        for i in self.unbounded:
+            if self.objects[i].occludes(ray, max_distance):
+                return i
+
+        if not self._nodes:
+            return None
+
+        origin = tuple(ray.origin)
+        inverse = inverse_direction(tuple(ray.direction))
+        nodes = self._nodes
+
+        box_min, box_max, _, _ = nodes[0]
+        entry = slab(origin, inverse, box_min, box_max)
+        stack = [] if entry is None else [(entry, 0)]
+
+        while stack:
+            entry, node = stack.pop()
+
+            if entry > max_distance:
+                continue
+
+            _, _, start, count = nodes[node]
+
+            if count > 0:
+                for i in self.order[start:start + count].tolist():
+                    if self.objects[i].occludes(ray, max_distance):
+                        return i
+
+                continue
+
+            stack.extend(self._children(origin, inverse, node))
+
+        return None
+
+    def _children(self, origin, inverse, node):
+        """(entry distance, index) of the children of an internal node hit by the ray."""
+        nodes = self._nodes
+        children = []
+
+        for child in (node + 1, nodes[node][2]):
+            child_min, child_max, _, _ = nodes[child]
+            entry = slab(origin, inverse, child_min, child_max)
+
+            if entry is not None:
+                children.append((entry, child))
+
+        return children
+
+    def intersectPacket(self, origins, directions):
+        """Returns for every ray the index of the closest object (-1 if none), the distance and the hit primitive."""
+        t = np.full(len(directions), np.inf)
+        indices = np.full(len(directions), -1, dtype=np.int64)
+        primitives = np.zeros(len(directions), dtype=np.int64)
+        rays = np.arange(len(directions))
+
+        for i in self.unbounded:
+            self._closest_packet(i, origins, directions, rays, t, indices, primitives)
+
+        if self._nodes:
+            inverses = 1.0 / np.where(directions == 0.0, 1e-30, directions)
+            self._intersect_node_packet(0, origins, directions, inverses, rays, t, indices, primitives)
+
+        return indices, t, primitives
+
+    def _closest_packet(self, i, origins, directions, rays, t, indices, primitives):
+        new_t, new_primitives = self.objects[i].hitPacket(origins[rays], directions[rays])
+
+        closer = (new_t > 0) & (new_t < t[rays])
+        t[rays[closer]] = new_t[closer]
+        indices[rays[closer]] = i
+        primitives[rays[closer]] = new_primitives[closer]
+
+    def _intersect_node_packet(self, node, origins, directions, inverses, rays, t, indices, primitives):
+        entry = slab_packet(origins[rays], inverses[rays], self.nodes_min[node], self.nodes_max[node])
+        rays = rays[entry < t[rays]]
+
+        if len(rays) == 0:
+            return
+
+        if self.nodes_count[node] > 0:
+            for i in self.order[self.nodes_start[node]:self.nodes_start[node] + self.nodes_count[node]].tolist():
+                self._closest_packet(i, origins, directions, rays, t, indices, primitives)
+
+            return
+
+        self._intersect_node_packet(node + 1, origins, directions, inverses, rays, t, indices, primitives)
+        self._intersect_node_packet(self.nodes_start[node], origins, directions, inverses, rays, t, indices, primitives)
+
+    def occludedPacket(self, origins, directions, max_distances):
+        """Returns a boolean mask of the rays hitting an object closer than their max distance."""
+        occluded = np.zeros(len(directions), dtype=bool)
+        rays = np.arange(len(directions))
+
+        for i in self.unbounded:
+            self._occluded_packet(i, origins, directions, max_distances, rays, occluded)
+
+        if self._nodes:
+            inverses = 1.0 / np.where(directions == 0.0, 1e-30, directions)
+            self._occluded_node_packet(0, origins, directions, inverses, max_distances, rays, occluded)
+
+        return occluded
+
+    def _occluded_packet(self, i, origins, directions, max_distances, rays, occluded):
+        # Points already in shadow are not tested again
+        rays = rays[~occluded[rays]]
+
+        if len(rays) == 0:
+            return
+
+        occluded[rays[self.objects[i].occludesPacket(origins[rays], directions[rays], max_distances[rays])]] = True
+
+    def _occluded_node_packet(self, node, origins, directions, inverses, max_distances, rays, occluded):
+        rays = rays[~occluded[rays]]
+        entry = slab_packet(origins[rays], inverses[rays], self.nodes_min[node], self.nodes_max[node])
+        rays = rays[entry < max_distances[rays]]
+
+        if len(rays) == 0:
+            return
+
+        if self.nodes_count[node] > 0:
+            for i in self.order[self.nodes_start[node]:self.nodes_start[node] + self.nodes_count[node]].tolist():
+                self._occluded_packet(i, origins, directions, max_distances, rays, occluded)
+
+            return
+
+        self._occluded_node_packet(node + 1, origins, directions, inverses, max_distances, rays, occluded)
+        self._occluded_node_packet(self.nodes_start[node], origins, directions, inverses, max_distances, rays, occluded)
@@ -0,0 +1,93 @@
+from typing import Optional
+from pyglm import glm
+import numpy as np
+
+from classes.material import Material
+from classes.hit import Hit
+from classes.ray import Ray
+from classes.objects.object import Object
+from classes.model import as_matrix
+
+class Instance(Object):
+    """
+    Copy of a shared object (typically a BVH or an Octree over a mesh) placed in the scene by a 4x4 transform.
+    Rays are brought into the object space of the shared object instead of transforming its geometry,
+    so any number of instances reuse the same triangles and acceleration structure.
+    """
+    object = None
+
+    def __init__(self, object: Object, transform=None, material: Optional[Material]=None):
+        """
+        - object: the shared object, it must not be added to the scene itself unless it should also appear untransformed.
+        - transform: object to world glm.mat4 or (4,4) array, composable with the helpers of classes.model. Identity by default.
+        - material: overrides the material of the shared object.
+        """
+        super().__init__(object.material if material is None else material)
+
+        self.object = object
+        self.matrix = np.eye(4) if transform is None else as_matrix(transform)
+        self.inverse = np.linalg.inv(self.matrix)
+
+        # Normals are transformed by the inverse transpose so that they stay perpendicular to non-uniformly scaled surfaces
+        self.normal_matrix = self.inverse[:3, :3].T
+
+        # glm copies for the scalar path (glm matrices are column-major)
+        self._inverse = glm.mat4(*self.inverse.T.flatten().tolist())
+        self._inverse_linear = glm.mat3(self._inverse)
+        self._normal_matrix = glm.mat3(*self.normal_matrix.T.flatten().tolist())
+
+    def toObjectRay(self, ray):
+        """
+        Returns the ray in object space and the length of its transformed direction. Ray normalizes the direction,
+        so object space distances are that length times the world space ones.
+        """
+        direction = self._inverse_linear * ray.direction
+        scale = glm.length(direction)
+        return Ray(glm.vec3(self._inverse * glm.vec4(ray.origin, 1.0)), direction), scale
+
+    def toObjectRays(self, origins, directions):
+        """Packet version of toObjectRay: transformed origins, normalized directions and direction lengths."""
+        origins = origins @ self.inverse[:3, :3].T + self.inverse[:3, 3]
+        directions = directions @ self.inverse[:3, :3].T
+        scales = np.linalg.norm(directions, axis=1)
+        return origins, directions / scales[:, None], scales
+
+    def hit(self, ray):
+        """Returns the hit record of the shared object with the distance and normal in world space, or None."""
+        local, scale = self.toObjectRay(ray)
+        hit = self.object.hit(local)
+
+        if hit is None:
+            return None
+
+        return Hit(hit.t / scale, glm.normalize(self._normal_matrix * hit.normal), hit.primitive, hit.u, hit.v)
+
+    def occludes(self, ray, maxDistance):
+        local, scale = self.toObjectRay(ray)
+        return self.object.occludes(local, maxDistance * scale)
+
+    def hitPacket(self, origins, directions):
+        origins, directions, scales = self.toObjectRays(origins, directions)
+        distances, primitives = self.object.hitPacket(origins, directions)
+        return distances / scales, primitives
+
+    def occludesPacket(self, origins, directions, maxDistances):
+        origins, directions, scales = self.toObjectRays(origins, directions)
+        return self.object.occludesPacket(origins, directions, maxDistances * scales)
+
+    def getNormalPacket(self, hitPoints, primitives):
+        points = hitPoints @ self.inverse[:3, :3].T + self.inverse[:3, 3]
+        normals = self.object.getNormalPacket(points, primitives) @ self.normal_matrix.T
+        return normals / np.linalg.norm(normals, axis=1, keepdims=True)
+
+    def boundingBox(self):
+        """Box around the transformed corners of the shared object's box, None if it is unbounded."""
+        box = self.object.boundingBox()
+
+        if box is None:
+            return None
+
+        box_min, box_max = np.array(box[0], dtype=np.float64), np.array(box[1], dtype=np.float64)
+        corners = np.array([[(box_min, box_max)[(i >> axis) & 1][axis] for axis in range(3)] for i in range(8)])
+        corners = corners @ self.matrix[:3, :3].T + self.matrix[:3, 3]
+        return glm.vec3(*corners.min(axis=0)), glm.vec3(*corners.max(axis=0))
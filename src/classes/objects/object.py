@@ -2,9 +2,17 @@ from abc import ABC, abstractmethod
 from typing import Optional
 from classes.ray import Ray
 from pyglm import glm
+import numpy as np
 from classes.material import Material
+from classes.hit import Hit
 
 class Object(ABC):
+	"""
+	Objet de la scène. Les rayons reçus ont des directions de norme 1 (Ray les normalise, et les paquets du Renderer,
+	de la caméra, des lumières et des instances aussi): les intersections peuvent s'en servir (a = dot(d, d) = 1).
+	"""
+	__slots__ = ("material",) # Les sous-classes sans __slots__ (octree, BVH, instances) gardent un __dict__
+
 	material: Material
     
 	def __init__(self, material: Optional[Material] = None) -> None:
@@ -14,9 +22,42 @@ class Object(ABC):
 			self.material = material
 
 	@abstractmethod
-	def hit(self, ray: Ray) -> float | None:
+	def hit(self, ray: Ray) -> Optional[Hit]:
+		"""Renvoie l'intersection la plus proche (distance, normale, primitive, coordonnées barycentriques) ou None. ray.direction est de norme 1."""
 		pass
 
-	@abstractmethod
-	def getNormal(self, hitPoint: glm.vec3) -> glm.vec3:
-		pass
\ No newline at end of file
+	def occludes(self, ray: Ray, maxDistance: float) -> bool:
+		"""Indique si l'objet coupe le rayon avant maxDistance. Contrairement à hit, la première intersection trouvée suffit."""
+		hit = self.hit(ray)
+		return hit is not None and hit.t < maxDistance
+
+	def occludesPacket(self, origins: np.ndarray, directions: np.ndarray, maxDistances: np.ndarray) -> np.ndarray:
+		"""Version vectorisée de occludes: renvoie le masque des rayons coupés avant leur distance maximale."""
+		t, _ = self.hitPacket(origins, directions)
+		return t < maxDistances
+
+	def boundingBox(self) -> Optional[tuple[glm.vec3, glm.vec3]]:
+		"""Renvoie la boîte englobante (min, max) de l'objet, ou None s'il est infini (comme un plan)."""
+		return None
+
+	def hitPacket(self, origins: np.ndarray, directions: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+		"""Intersecte un paquet de rayons (N,3) de directions de norme 1. Renvoie les distances (inf si pas d'intersection) et l'indice de la primitive touchée."""
+		# Implémentation par défaut: un appel scalaire par rayon, à surcharger pour de vraies performances
+		distances = np.full(len(directions), np.inf)
+		primitives = np.zeros(len(directions), dtype=np.int64)
+
+		for i in range(len(directions)):
+			hit = self.hit(Ray(glm.vec3(*origins[i]), glm.vec3(*directions[i])))
+
+			if hit is not None:
+				distances[i] = hit.t
+				primitives[i] = hit.primitive
+
+		return distances, primitives
+
+	def getNormalPacket(self, hitPoints: np.ndarray, primitives: np.ndarray) -> np.ndarray:
+		"""
+		Renvoie les normales (N,3) aux points d'intersection d'un paquet de rayons.
+		L'implémentation par défaut utilise getNormal(hitPoint), que seules les formes analytiques fournissent.
+		"""
+		return np.array([tuple(self.getNormal(glm.vec3(*point))) for point in hitPoints], dtype=np.float64).reshape(-1, 3)
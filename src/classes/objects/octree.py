@@ -1,11 +1,13 @@
 from typing import Optional
 from pyglm import glm
-import sys
+import numpy as np
 
 from classes.material import Material
+from classes.hit import Hit
 from classes.objects.object import Object
 from classes.objects.plane import Plane
 from classes.model import Model
+from classes.objects.triangle import intersect_triangles, pack_triangles, closest_triangle, any_triangle, cross
 
 class Cell:
     def generate_planes(self):
@@ -24,6 +26,13 @@ class Cell:
         self.planes = []
         self.children = []
         self.generate_planes()
+
+        # Triangles of a leaf stored as contiguous arrays, filled by Octree.pack_cell
+        self.indices = None
+        self.v0 = None
+        self.edge1 = None
+        self.edge2 = None
+        self.packed = None
     
     def hit(self, ray):
         """Check if ray hits cell's bounding box. Returns (tmin, tmax) or None."""
@@ -55,6 +64,28 @@ class Cell:
         
         return (tmin, tmax)
 
+    def hitPacket(self, origins, directions):
+        """Vectorized slab test. Returns a boolean mask of the rays hitting the cell's bounding box."""
+        if getattr(self, "bounds", None) is None:
+            self.bounds = (np.array(self.min, dtype=np.float64), np.array(self.max, dtype=np.float64))
+
+        box_min, box_max = self.bounds
+
+        parallel = np.abs(directions) < 1e-8
+        inv = 1.0 / np.where(parallel, 1.0, directions)
+        t1 = (box_min - origins) * inv
+        t2 = (box_max - origins) * inv
+
+        # Parallel slabs don't constrain t, but the origin has to be inside them
+        t_near = np.where(parallel, -np.inf, np.minimum(t1, t2))
+        t_far = np.where(parallel, np.inf, np.maximum(t1, t2))
+        outside = parallel & ((origins < box_min) | (origins > box_max))
+
+        tmin = np.maximum(t_near.max(axis=1), 0.0)
+        tmax = t_far.min(axis=1)
+
+        return (tmin <= tmax) & ~outside.any(axis=1)
+
 class Octree(Object):
     model = None
     min = glm.vec3(0.0,0.0,0.0)
@@ -64,37 +95,41 @@ class Octree(Object):
     root = None
 
     planes = []
+
+    # Maximum number of ray/triangle pairs tested at once in a leaf, bounds the packet memory usage
+    packet_pairs = 1 << 18
     
     def compute_boundingBox(self):
-        min = glm.vec3(sys.float_info.max, sys.float_info.max, sys.float_info.max)
-        max = glm.vec3(-sys.float_info.max, -sys.float_info.max, -sys.float_info.max)
-        for v in self.model.vertices:
-            if v.x < min.x:
-                min.x = v.x
-            if v.y < min.y:
-                min.y = v.y
-            if v.z < min.z:
-                min.z = v.z
-            if v.x > max.x:
-                max.x = v.x
-            if v.y > max.y:
-                max.y = v.y
-            if v.z > max.z:
-                max.z = v.z
-        self.min = min
-        self.max = max
+        self.min, self.max = self.model.bounds()
 
     def __init__(self, model: Model, material: Optional[Material]=None):
         super().__init__(material)
         
         self.model = model
-        self._last_hit_triangle = None  # Store last hit triangle for getNormal
         self.compute_boundingBox()
         self.root = Cell(self.min, self.max)
         self.num_cells = 1
         self.root.triangles = self.model.triangles
         for t in self.root.triangles:
             t.parent = self
+
+        # Precompute the Möller–Trumbore constants of every triangle once, leaves index into them
+        vertices = self.model.vertices[self.model.faces].astype(np.float64)
+        self.v0 = vertices[:, 0]
+        self.edge1 = vertices[:, 1] - vertices[:, 0]
+        self.edge2 = vertices[:, 2] - vertices[:, 0]
+        normals = cross(self.edge1, self.edge2)
+        self.normals = normals / np.linalg.norm(normals, axis=1, keepdims=True)
+        self._triangle_index = {id(t): i for i, t in enumerate(self.model.triangles)}
+        self.pack_cell(self.root)
+
+    def pack_cell(self, cell):
+        """Store the triangles of a leaf cell as contiguous arrays for the batched intersection kernel."""
+        cell.indices = np.array([self._triangle_index[id(t)] for t in cell.triangles], dtype=np.int64)
+        cell.v0 = self.v0[cell.indices]
+        cell.edge1 = self.edge1[cell.indices]
+        cell.edge2 = self.edge2[cell.indices]
+        cell.packed = pack_triangles(cell.v0, cell.edge1, cell.edge2)
     
     def isInCell(self, triangle, cell):
         eps = 1e-12
@@ -107,6 +142,7 @@ class Octree(Object):
 
     def subdivide_cell(self, cell, depth):
         if depth >= self.max_depth or len(cell.triangles) <= 100:
+            self.pack_cell(cell)
             return
         mid = (cell.min + cell.max) / 2
         cell.children = []
@@ -125,6 +161,7 @@ class Octree(Object):
                 if self.isInCell(triangle, c):
                     c.triangles.append(triangle)
         cell.triangles = []
+        cell.indices = cell.v0 = cell.edge1 = cell.edge2 = cell.packed = None
         for c in cell.children:
             self.subdivide_cell(c, depth +1)
 
@@ -132,48 +169,122 @@ class Octree(Object):
         self.subdivide_cell(self.root, 0)
 
     def hit(self, ray):
-        """Returns closest t distance, or None if no hit."""
-        t, triangle = self._hit_cell(self.root, ray)
-        self._last_hit_triangle = triangle  # Store for getNormal/getColor
-        return t
+        """Returns the hit record of the closest triangle, or None if no hit."""
+        closest = self._hit_cell(self.root, ray)
+        if closest is None:
+            return None
+
+        t, triangle, u, v = closest
+        return Hit(t, glm.vec3(*self.normals[triangle]), triangle, u, v)
     
     def _hit_cell(self, cell, ray):
-        """Recursively traverse octree to find closest triangle intersection."""
+        """Recursively traverse octree to find closest triangle intersection. Returns (t, triangle index, u, v) or None."""
         # First check if ray hits this cell's bounding box
         box_hit = cell.hit(ray)
         if box_hit is None:
-            return None, None
+            return None
         
-        closest_t = None
-        closest_triangle = None
+        closest = None
         
-        # If this is a leaf node (has triangles, no children)
+        # If this is a leaf node, test the ray against all its triangles at once
         if cell.triangles:
-            for triangle in cell.triangles:
-                t = triangle.hit(ray)
-                if t is not None and t > 1e-6:
-                    if closest_t is None or t < closest_t:
-                        closest_t = t
-                        closest_triangle = triangle
+            leaf_hit = closest_triangle(ray.origin, ray.direction, cell.packed, 1e-6)
+            if leaf_hit is not None:
+                t, index, u, v = leaf_hit
+                closest = (t, int(cell.indices[index]), u, v)
         
         # Recurse into children
         if cell.children:
             for child in cell.children:
-                t, tri = self._hit_cell(child, ray)
-                if t is not None:
-                    if closest_t is None or t < closest_t:
-                        closest_t = t
-                        closest_triangle = tri
+                child_hit = self._hit_cell(child, ray)
+                if child_hit is not None:
+                    if closest is None or child_hit[0] < closest[0]:
+                        closest = child_hit
         
-        return closest_t, closest_triangle
+        return closest
+
+    def occludes(self, ray, maxDistance):
+        """Any-hit traversal: returns True on the first triangle closer than maxDistance."""
+        return self._occludes_cell(self.root, ray, maxDistance)
+
+    def _occludes_cell(self, cell, ray, maxDistance):
+        box_hit = cell.hit(ray)
+        if box_hit is None or box_hit[0] > maxDistance:
+            return False
+
+        if cell.triangles and any_triangle(ray.origin, ray.direction, cell.packed, 1e-6, maxDistance):
+            return True
+
+        for child in cell.children:
+            if self._occludes_cell(child, ray, maxDistance):
+                return True
+
+        return False
+
+    def occludesPacket(self, origins, directions, maxDistances):
+        occluded = np.zeros(len(directions), dtype=bool)
+        self._occludes_cell_packet(self.root, origins, directions, maxDistances, np.arange(len(directions)), occluded)
+        return occluded
+
+    def _occludes_cell_packet(self, cell, origins, directions, maxDistances, rays, occluded):
+        """Like _hit_cell_packet, but the rays leave the traversal as soon as they are occluded."""
+        rays = rays[~occluded[rays]]
+        rays = rays[cell.hitPacket(origins[rays], directions[rays])]
+
+        if len(rays) == 0:
+            return
+
+        if cell.triangles:
+            chunk = max(1, self.packet_pairs // len(cell.indices))
+
+            for start in range(0, len(rays), chunk):
+                subset = rays[start:start + chunk]
+                t = intersect_triangles(origins[subset], directions[subset], cell.v0, cell.edge1, cell.edge2)
+                occluded[subset] = ((t > 1e-6) & (t < maxDistances[subset, None])).any(axis=1)
+
+        for child in cell.children:
+            self._occludes_cell_packet(child, origins, directions, maxDistances, rays, occluded)
+
+    def hitPacket(self, origins, directions):
+        """Returns closest t distances (inf if no hit) and hit triangle indices for a packet of rays."""
+        distances = np.full(len(directions), np.inf)
+        triangles = np.full(len(directions), -1, dtype=np.int64)
+        self._hit_cell_packet(self.root, origins, directions, np.arange(len(directions)), distances, triangles)
+
+        return distances, triangles
+
+    def _hit_cell_packet(self, cell, origins, directions, rays, distances, triangles):
+        """Recursively traverse the octree with the subset of rays that hit each cell."""
+        inside = cell.hitPacket(origins[rays], directions[rays])
+        rays = rays[inside]
+
+        if len(rays) == 0:
+            return
+
+        if cell.triangles:
+            chunk = max(1, self.packet_pairs // len(cell.indices))
+
+            for start in range(0, len(rays), chunk):
+                subset = rays[start:start + chunk]
+                t = intersect_triangles(origins[subset], directions[subset], cell.v0, cell.edge1, cell.edge2)
+                t[t <= 1e-6] = np.inf
+
+                closest = np.argmin(t, axis=1)
+                closest_t = t[np.arange(len(subset)), closest]
+                better = closest_t < distances[subset]
+
+                distances[subset[better]] = closest_t[better]
+                triangles[subset[better]] = cell.indices[closest[better]]
+
+        for child in cell.children:
+            self._hit_cell_packet(child, origins, directions, rays, distances, triangles)
+
+    def getNormalPacket(self, hitPoints, primitives):
+        return self.normals[primitives]
+
+    def boundingBox(self):
+        return self.min, self.max
 
-    def getNormal(self, hitPoint):
-        """Return normal of the last hit triangle."""
-        if self._last_hit_triangle:
-            return self._last_hit_triangle.getNormal(hitPoint)
-        
-        return glm.vec3(0, 1, 0)  # Fallback
-    
     def getColor(self, hitPoint, r=None, depth=None):
         """Return color from the octree's material."""
         return self.material.diffuse_color
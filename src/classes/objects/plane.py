@@ -2,10 +2,14 @@ from typing import Optional
 from classes.objects.object import Object
 from classes.material import Material
 from pyglm import glm
+import numpy as np
 
 from classes.ray import Ray
+from classes.hit import Hit
 
 class Plane(Object):
+	__slots__ = ("point", "normal", "D", "_normal")
+
 	point: glm.vec3
 	normal: glm.vec3
 	
@@ -15,10 +19,12 @@ class Plane(Object):
 		self.point = point
 		self.normal = glm.normalize(normal)
 
-	def hit(self, ray: Ray) -> float | None:
-		D = -glm.dot(self.normal, self.point)
+		# Équation du plan dot(normal, p) + D = 0, calculée une fois
+		self.D = -glm.dot(self.normal, self.point)
+		self._normal = np.array(self.normal, dtype=np.float64)
 
-		numerator = -(D + glm.dot(self.normal, ray.origin))
+	def hit(self, ray: Ray) -> Optional[Hit]:
+		numerator = -(self.D + glm.dot(self.normal, ray.origin))
 		denominator = glm.dot(self.normal, ray.direction)
 		
 		if abs(denominator) < 1e-6:
@@ -27,10 +33,33 @@ class Plane(Object):
 		t = numerator / denominator
 		
 		if t >= 0:
-			return t
+			return Hit(t, self.normal)
 		
 		else:
 			return None
 	
+	def occludes(self, ray: Ray, maxDistance: float) -> bool:
+		denominator = glm.dot(self.normal, ray.direction)
+		
+		if abs(denominator) < 1e-6:
+			return False
+
+		t = -(self.D + glm.dot(self.normal, ray.origin)) / denominator
+
+		return 0 <= t < maxDistance
+
 	def getNormal(self, hitPoint: glm.vec3) -> glm.vec3:
-		return self.normal
\ No newline at end of file
+		return self.normal
+
+	def hitPacket(self, origins: np.ndarray, directions: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+		numerator = -(self.D + origins @ self._normal)
+		denominator = directions @ self._normal
+
+		parallel = np.abs(denominator) < 1e-6
+		t = numerator / np.where(parallel, 1.0, denominator)
+		t[parallel | (t < 0)] = np.inf
+
+		return t, np.zeros(len(directions), dtype=np.int64)
+
+	def getNormalPacket(self, hitPoints: np.ndarray, primitives: np.ndarray) -> np.ndarray:
+		return np.broadcast_to(self._normal, hitPoints.shape)
\ No newline at end of file
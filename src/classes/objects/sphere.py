@@ -2,9 +2,13 @@ from classes.objects.object import Object
 from classes.material import Material
 from pyglm import glm
 from classes.ray import Ray
+from classes.hit import Hit
 from typing import Optional
+import numpy as np
 
 class Sphere(Object):
+	__slots__ = ("center", "radius", "radius2", "_center")
+
 	center: glm.vec3
 	radius: float
 	
@@ -14,28 +18,80 @@ class Sphere(Object):
 		self.center = center
 		self.radius = radius
 
-	def hit(self, ray: Ray) -> float | None:
+		# Constantes dérivées, calculées une fois (une sphère ne change pas après sa construction)
+		self.radius2 = radius * radius
+		self._center = np.array(center, dtype=np.float64)
+
+	def hit(self, ray: Ray) -> Optional[Hit]:
 		oc = ray.origin - self.center
 		
-		a = glm.dot(ray.direction, ray.direction)
-		b = 2.0 * glm.dot(oc, ray.direction)
-		c = glm.dot(oc, oc) - self.radius ** 2
+		# Direction de norme 1: a = 1, et avec b = dot(oc, d) (demi-coefficient) les racines sont -b ± sqrt(b² - c)
+		b = glm.dot(oc, ray.direction)
+		c = glm.dot(oc, oc) - self.radius2
 		
-		discriminant = b*b - 4*a*c
+		discriminant = b*b - c
 		
 		if discriminant < 0:
 			return None
 		
 		distance = glm.sqrt(discriminant)
-		t1 = (-b - distance) / (2.0*a)
-		t2 = (-b + distance) / (2.0*a)
+		t1 = -b - distance
+		t2 = -b + distance
 		
 		if t1 >= 0:
-			return t1
+			t = t1
 		elif t2 >= 0:
-			return t2
+			t = t2
 		else:
 			return None
 
+		return Hit(t, self.getNormal(ray.origin + t * ray.direction))
+
+	def occludes(self, ray: Ray, maxDistance: float) -> bool:
+		oc = ray.origin - self.center
+		
+		b = glm.dot(oc, ray.direction)
+		c = glm.dot(oc, oc) - self.radius2
+
+		# Origine hors de la sphère et sphère derrière le rayon: aucune intersection possible
+		if c > 0 and b > 0:
+			return False
+
+		discriminant = b*b - c
+
+		if discriminant < 0:
+			return False
+
+		distance = glm.sqrt(discriminant)
+		t1 = -b - distance
+		t = t1 if t1 >= 0 else -b + distance
+
+		return 0 <= t < maxDistance
+
 	def getNormal(self, hitPoint: glm.vec3) -> glm.vec3:
-		return glm.normalize(hitPoint - self.center)
\ No newline at end of file
+		return glm.normalize(hitPoint - self.center)
+
+	def boundingBox(self) -> tuple[glm.vec3, glm.vec3]:
+		return self.center - glm.vec3(self.radius), self.center + glm.vec3(self.radius)
+
+	def hitPacket(self, origins: np.ndarray, directions: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+		oc = origins - self._center
+
+		b = np.einsum("ij,ij->i", oc, directions)
+		c = np.einsum("ij,ij->i", oc, oc) - self.radius2
+
+		discriminant = b*b - c
+		hit = discriminant >= 0
+
+		distance = np.sqrt(np.where(hit, discriminant, 0.0))
+		t1 = -b - distance
+		t2 = -b + distance
+
+		t = np.where(t1 >= 0, t1, np.where(t2 >= 0, t2, np.inf))
+		t[~hit] = np.inf
+
+		return t, np.zeros(len(directions), dtype=np.int64)
+
+	def getNormalPacket(self, hitPoints: np.ndarray, primitives: np.ndarray) -> np.ndarray:
+		normals = hitPoints - self._center
+		return normals / np.linalg.norm(normals, axis=1, keepdims=True)
\ No newline at end of file
@@ -1,10 +1,101 @@
 from typing import Optional
 from pyglm import glm
 import sys
+import numpy as np
 from classes.objects.object import Object
 from classes.material import Material
+from classes.hit import Hit
+
+def cross(a, b):
+    """Produit vectoriel sur le dernier axe, plus rapide que np.cross pour de petits tableaux."""
+    a0, a1, a2 = a[..., 0], a[..., 1], a[..., 2]
+    b0, b1, b2 = b[..., 0], b[..., 1], b[..., 2]
+    return np.stack((a1 * b2 - a2 * b1, a2 * b0 - a0 * b2, a0 * b1 - a1 * b0), axis=-1)
+
+def intersect_triangles(origins, directions, v0, edge1, edge2):
+    """
+    Möller–Trumbore vectorisé entre k rayons et m triangles.
+    - origins, directions: tableaux (k,3).
+    - v0, edge1, edge2: tableaux (m,3).
+    Renvoie un tableau (k,m) des distances, inf si pas d'intersection.
+    """
+    d = directions[:, None, :]
+
+    pVec = cross(d, edge2[None, :, :])
+    det = np.einsum("kmi,mi->km", pVec, edge1)
+
+    parallel = np.abs(det) < sys.float_info.epsilon
+    invDet = 1.0 / np.where(parallel, 1.0, det)
+
+    tVec = origins[:, None, :] - v0[None, :, :]
+    u = np.einsum("kmi,kmi->km", tVec, pVec) * invDet
+
+    qVec = cross(tVec, edge1[None, :, :])
+    v = np.einsum("kmi,kmi->km", np.broadcast_to(d, qVec.shape), qVec) * invDet
+
+    t = np.einsum("mi,kmi->km", edge2, qVec) * invDet
+
+    miss = parallel | (u < 0.0) | (u > 1.0) | (v < 0.0) | (u + v > 1.0) | ~(t > sys.float_info.epsilon)
+    t[miss] = np.inf
+
+    return t
+
+def pack_triangles(v0, edge1, edge2):
+    """
+    Précalcule les constantes de closest_triangle pour m triangles (v0, edge1, edge2 de forme (m,3)).
+    Möller–Trumbore réécrit avec des produits mixtes: tout ce qui ne dépend que du triangle
+    (normale non normalisée, v0 x edge1, edge2 x v0 et dot(normale, v0)) est calculé une seule fois.
+    """
+    normal = cross(edge1, edge2)
+    return np.stack((normal, cross(edge2, v0), cross(v0, edge1), edge2, edge1)), np.einsum("ij,ij->i", normal, v0)
+
+def triangle_distances(origin, direction, packed):
+    """
+    Möller–Trumbore entre un seul rayon et m triangles préparés par pack_triangles.
+    Renvoie les tableaux (m,) des distances (inf pour les triangles manqués) et des coordonnées barycentriques u, v.
+    """
+    matrix, normal_dot_v0 = packed
+    ox, oy, oz = origin
+    dx, dy, dz = direction
+
+    # Colonnes: direction, origine x direction, origine
+    products = matrix @ np.array((
+        (dx, oy * dz - oz * dy, ox),
+        (dy, oz * dx - ox * dz, oy),
+        (dz, ox * dy - oy * dx, oz),
+    ))
+
+    det = -products[0, :, 0]
+    det[np.abs(det) < sys.float_info.epsilon] = np.nan # Rayon parallèle: NaN fait échouer tous les tests suivants
+
+    u = (products[3, :, 1] - products[1, :, 0]) / det
+    v = (-products[4, :, 1] - products[2, :, 0]) / det
+    t = (products[0, :, 2] - normal_dot_v0) / det
+
+    t[~((u >= 0.0) & (v >= 0.0) & (u + v <= 1.0))] = np.inf
+
+    return t, u, v
+
+def closest_triangle(origin, direction, packed, t_min=sys.float_info.epsilon):
+    """Renvoie (t, index, u, v) du triangle le plus proche au-delà de t_min, ou None."""
+    t, u, v = triangle_distances(origin, direction, packed)
+    t[~(t > t_min)] = np.inf
+
+    index = int(np.argmin(t))
+
+    if t[index] == np.inf:
+        return None
+
+    return float(t[index]), index, float(u[index]), float(v[index])
+
+def any_triangle(origin, direction, packed, t_min, t_max):
+    """Indique si au moins un triangle est touché entre t_min et t_max."""
+    t, _, _ = triangle_distances(origin, direction, packed)
+    return bool(((t > t_min) & (t < t_max)).any())
 
 class Triangle(Object):
+    __slots__ = ("vertices", "parent", "edge1", "edge2", "normal") # parent: octree du maillage, assigné par Octree
+
     vertices: list[glm.vec3]
 
     def __init__(self, v0: glm.vec3, v1: glm.vec3, v2: glm.vec3, material: Optional[Material] = None) -> None:
@@ -12,11 +103,17 @@ class Triangle(Object):
 
         self.vertices = [v0,v1,v2]
 
+        # Constantes de Möller–Trumbore et normale unitaire, calculées une fois
+        self.edge1 = v1 - v0
+        self.edge2 = v2 - v0
+        self.normal = glm.normalize(glm.cross(self.edge1, self.edge2))
+
     def hit(self, ray):
-        edge1 = self.vertices[1] - self.vertices[0]
-        edge2 = self.vertices[2] - self.vertices[0]
+        edge1 = self.edge1
+        edge2 = self.edge2
 
-        pVec = glm.cross(glm.normalize(ray.direction), edge2)
+        # Ray normalise déjà la direction
+        pVec = glm.cross(ray.direction, edge2)
         det = glm.dot(edge1, pVec)
 
         if abs(det) < sys.float_info.epsilon:
@@ -32,14 +129,51 @@ class Triangle(Object):
             return None
         
         qVec = glm.cross(tVec, edge1)
-        v = glm.dot(glm.normalize(ray.direction), qVec) * invDet
+        v = glm.dot(ray.direction, qVec) * invDet
         if v < 0.0 or u+v > 1.0:
             return None
         
         p_t = glm.dot(edge2, qVec) * invDet
 
         if p_t > sys.float_info.epsilon:
-            return p_t
+            return Hit(p_t, self.normal, 0, u, v)
+
+    def occludes(self, ray, maxDistance):
+        """Same test as hit, but the distance is checked first so that triangles beyond maxDistance are rejected early."""
+        edge1 = self.edge1
+        edge2 = self.edge2
+
+        pVec = glm.cross(ray.direction, edge2)
+        det = glm.dot(edge1, pVec)
+
+        if abs(det) < sys.float_info.epsilon:
+            return False
+
+        invDet = 1.0 / det
+
+        tVec = ray.origin - self.vertices[0]
+        qVec = glm.cross(tVec, edge1)
+
+        p_t = glm.dot(edge2, qVec) * invDet
+
+        if p_t <= sys.float_info.epsilon or p_t >= maxDistance:
+            return False
+
+        u = glm.dot(tVec, pVec) * invDet
+        v = glm.dot(ray.direction, qVec) * invDet
+
+        return u >= 0.0 and v >= 0.0 and u + v <= 1.0
 
     def getNormal(self, hitPoint: glm.vec3) -> glm.vec3:
-        return glm.normalize(glm.cross(self.vertices[1]-self.vertices[0], self.vertices[2]-self.vertices[0]))
\ No newline at end of file
+        return self.normal
+
+    def boundingBox(self):
+        return glm.min(glm.min(self.vertices[0], self.vertices[1]), self.vertices[2]), glm.max(glm.max(self.vertices[0], self.vertices[1]), self.vertices[2])
+
+    def hitPacket(self, origins, directions):
+        v0, edge1, edge2 = (np.array(v, dtype=np.float64) for v in (self.vertices[0], self.edge1, self.edge2))
+        t = intersect_triangles(origins, directions, v0[None], edge1[None], edge2[None])[:, 0]
+        return t, np.zeros(len(directions), dtype=np.int64)
+
+    def getNormalPacket(self, hitPoints, primitives):
+        return np.broadcast_to(np.array(self.normal, dtype=np.float64), hitPoints.shape)
\ No newline at end of file
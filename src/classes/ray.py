@@ -1,6 +1,39 @@
 from pyglm import glm
+import numpy as np
 
 class Ray:
 	def __init__(self, origin: glm.vec3, direction: glm.vec3) -> None:
 		self.origin = origin
-		self.direction = glm.normalize(direction)
\ No newline at end of file
+		self.direction = glm.normalize(direction)
+
+class RayQueue:
+	"""
+	File de rayons du moteur wavefront (Renderer.traceRays), un rayon par ligne de tableaux alignés:
+	- origins, directions: (N,3), directions normalisées.
+	- weights: (N,3) poids RGB du rayon dans la couleur de son pixel (produit des coefficients le long du chemin).
+	- depths: (N,) nombre de rebonds depuis le rayon primaire.
+	- pixels: (N,) indice, dans le paquet de départ, du rayon primaire qui reçoit la couleur.
+	"""
+	def __init__(self, origins: np.ndarray, directions: np.ndarray, weights: np.ndarray, depths: np.ndarray, pixels: np.ndarray) -> None:
+		self.origins = origins
+		self.directions = directions
+		self.weights = weights
+		self.depths = depths
+		self.pixels = pixels
+
+	def __len__(self) -> int:
+		return len(self.pixels)
+
+	def select(self, rays: np.ndarray) -> "RayQueue":
+		"""Sous-file des rayons d'indices (ou de masque) rays."""
+		return RayQueue(self.origins[rays], self.directions[rays], self.weights[rays], self.depths[rays], self.pixels[rays])
+
+	@staticmethod
+	def concatenate(queues: list["RayQueue"]) -> "RayQueue":
+		if not queues:
+			return RayQueue(np.zeros((0, 3)), np.zeros((0, 3)), np.zeros((0, 3)), np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64))
+
+		if len(queues) == 1:
+			return queues[0]
+
+		return RayQueue(*(np.concatenate(arrays) for arrays in zip(*((q.origins, q.directions, q.weights, q.depths, q.pixels) for q in queues))))
@@ -1,25 +1,79 @@
 from classes.camera import Camera
 from classes.scene import Scene
-from random import random
 from glm import vec3
 import numpy as np
 from PIL import Image
 from pyglm import glm
-from classes.ray import Ray
-from typing import Optional
-from constants import AMBIANT_LIGHT, EPSILON
+from classes.ray import Ray, RayQueue
+from classes.hit import Hit
+from typing import Callable, Optional
+from constants import AMBIANT_LIGHT, EPSILON, PACKET_SIZE, TILE_SIZE, ADAPTIVE_THRESHOLD, MIN_SAMPLES, MAX_SAMPLES, MIN_WEIGHT, RUSSIAN_ROULETTE, LIGHT_SAMPLES
 from classes.objects.object import Object
+from classes.samplers.sampler import Sampler, hashFloat, hashFloats
+from classes.samplers.sobol_sampler import SobolSampler
+from classes.stats import RenderStats, HEATMAP_CHANNELS, falseColour, profiled
 from datetime import datetime
+from multiprocessing import Pool
+from functools import partial
+from contextlib import nullcontext
+import json
+import os
+import struct
+
+# État propre à chaque processus du rendu parallèle: la scène est construite une seule fois par processus
+_workerRenderer: Optional["Renderer"] = None
+_workerScene: Optional[Scene] = None
+
+def _initWorker(createScene: Callable[[Scene], None], camera: Camera, width: int, height: int, samples: int, maxDepth: int, packetSize: int, sampler: Sampler, stats: bool, heatmap: bool, minWeight: float, russianRoulette: bool, lightSamples: Optional[int]) -> None:
+	global _workerRenderer, _workerScene
+
+	# Les échantillons ne dépendent que du pixel: le résultat est identique au rendu dans un seul processus
+	_workerRenderer = Renderer(camera, width, height, samples, maxDepth, packetSize, sampler, stats, heatmap, minWeight, russianRoulette, lightSamples)
+	_workerScene = Scene()
+
+	with _workerRenderer.stats.phase("build") if stats else nullcontext():
+		createScene(_workerScene)
+
+def _renderTile(tile: tuple[int, int, int, int], packet: bool) -> tuple[int, int, np.ndarray, Optional[dict], Optional[np.ndarray]]:
+	x, y, width, height = tile
+
+	if packet:
+		_workerRenderer.renderPacket(_workerScene, x, y, width, height)
+	else:
+		_workerRenderer.render(_workerScene, x, y, width, height)
+
+	# Les statistiques de la tuile (et de la construction de la scène pour la première) sont renvoyées au processus principal
+	report = None
+
+	if _workerRenderer.stats is not None:
+		report = _workerRenderer.stats.report()
+		_workerRenderer.stats.reset()
+
+	heatmap = None
+
+	if _workerRenderer.heatmap is not None:
+		heatmap = _workerRenderer.heatmap[y:y + height, x:x + width].copy()
+
+	return x, y, _workerRenderer.output[y:y + height, x:x + width].copy(), report, heatmap
 
 class Renderer:
 	output: np.ndarray
+	accumulation: np.ndarray
+	sampleCount: np.ndarray
 	width: int
 	height: int
 	camera: Camera
 	samples: int
 	maxDepth: int
+	packetSize: int
+	sampler: Sampler
+	stats: Optional[RenderStats]
+	heatmap: Optional[np.ndarray]
+	minWeight: float
+	russianRoulette: bool
+	lightSamples: Optional[int]
 	
-	def __init__(self, camera: Camera, width: int, height: int, samples: int = 1, maxDepth: int = 5) -> None:
+	def __init__(self, camera: Camera, width: int, height: int, samples: int = 1, maxDepth: int = 5, packetSize: int = PACKET_SIZE, sampler: Optional[Sampler] = None, stats: bool = False, heatmap: bool = False, minWeight: float = MIN_WEIGHT, russianRoulette: bool = RUSSIAN_ROULETTE, lightSamples: Optional[int] = LIGHT_SAMPLES) -> None:
 		if samples < 1:
 			raise ValueError("Samples must be at least 1")
 		
@@ -28,10 +82,20 @@ class Renderer:
 		self.width = width
 		self.height = height
 		self.maxDepth = maxDepth # Profondeur maximale de récursion pour les rayons
+		self.packetSize = packetSize # Nombre maximal de rayons primaires traités ensemble par renderPacket
+		self.minWeight = minWeight # Poids sous lequel un rayon secondaire est abandonné ou soumis à la roulette russe (0 pour tout tracer)
+		self.russianRoulette = russianRoulette
+		self.lightSamples = lightSamples # Lumières tirées par point d'impact selon leur contribution (None: toutes, voir LightTable.sample)
+		self.sampler = sampler or SobolSampler() # Positions des échantillons dans les pixels pour l'anti-aliasing
 		self.output = np.zeros((self.height, self.width, 3), dtype=np.float32)
+		self.accumulation = np.zeros((self.height, self.width, 3), dtype=np.float64) # Somme des échantillons du rendu progressif
+		self.sampleCount = np.zeros((self.height, self.width), dtype=np.int32) # Nombre d'échantillons accumulés par pixel
+		self.stats = RenderStats() if stats or heatmap else None # Statistiques des rendus, aucune mesure si None
+		self.heatmap = np.zeros((self.height, self.width, len(HEATMAP_CHANNELS)), dtype=np.float64) if heatmap else None # Coût de chaque pixel (rayons, tests, secondes), lu dans les statistiques
 
 		self.camera.resize(width, height) # Assure que la caméra est configurée pour la bonne taille d'image
 		
+	@profiled()
 	def render(self, scene: Scene, xOffset: int = 0, yOffset: int = 0, width: Optional[int] = None, height: Optional[int] = None) -> None:
 		if width is None:
 			width = self.width
@@ -39,93 +103,506 @@ class Renderer:
 		if height is None:
 			height = self.height
 
+		# Supersampling anti-aliasing: les positions des échantillons de toute la zone sont générées en un appel
+		if self.samples > 1:
+			pixelY, pixelX = np.mgrid[yOffset:yOffset + height, xOffset:xOffset + width]
+			offsets = (self.sampler.tileOffsets(pixelX.ravel(), pixelY.ravel(), self.samples) - 0.5).reshape(height, width, self.samples, 2).tolist()
+		else:
+			offsets = np.zeros((height, width, 1, 2)).tolist()
+
+		measure = self.heatmap is not None
+
 		for y in range(yOffset, yOffset + height):
 			for x in range(xOffset, xOffset + width):
+				if measure:
+					start = self.stats.counters()
+
 				color = vec3(0, 0, 0) # Noir
 
-				for _ in range(self.samples):
-					color += self.computePixelColor(scene, x, y)
+				for dx, dy in offsets[y - yOffset][x - xOffset]:
+					color += self.computePixelColor(scene, x + dx, y + dy)
 
 				self.output[y, x] = color.xyz / self.samples # Moyenne des échantillons
 
+				if measure:
+					self.heatmap[y, x] += self.stats.counters() - start
+
+	@profiled()
+	def renderPacket(self, scene: Scene, xOffset: int = 0, yOffset: int = 0, width: Optional[int] = None, height: Optional[int] = None) -> None:
+		"""Équivalent vectorisé de render: les rayons sont générés, intersectés et ombrés par paquets de tableaux NumPy."""
+		if width is None:
+			width = self.width
+
+		if height is None:
+			height = self.height
+
+		self.checkHeatmap()
+
+		pixelY, pixelX = np.mgrid[yOffset:yOffset + height, xOffset:xOffset + width]
+		pixelX, pixelY = pixelX.ravel(), pixelY.ravel()
+
+		colors = np.zeros((width * height, 3), dtype=np.float64)
+
+		for sample in range(self.samples):
+			# Supersampling anti-aliasing: les rayons de toute la zone sont générés en un appel, puis tracés par paquets
+			offsets = self.sampler.offsets(pixelX, pixelY, sample) - 0.5 if self.samples > 1 else None
+			origins, directions = self.camera.tileRays(xOffset, yOffset, width, height, offsets)
+
+			for start in range(0, len(directions), self.packetSize):
+				packet = slice(start, start + self.packetSize)
+				colors[packet] += self.traceRays(scene, origins[packet], directions[packet])
+
+		self.output[yOffset:yOffset + height, xOffset:xOffset + width] = (colors / self.samples).reshape(height, width, 3) # Moyenne des échantillons
+
+	@profiled()
+	def renderProgressive(self, scene: Scene, passes: Optional[int] = None, packet: bool = False, previewPath: Optional[str] = None, previewInterval: int = 1, checkpointPath: Optional[str] = None, checkpointInterval: int = 1) -> None:
+		"""
+		Rendu progressif: chaque passe ajoute un échantillon par pixel à un tampon de somme (self.accumulation)
+		et à un compteur d'échantillons (self.sampleCount), et self.output contient la moyenne courante.
+		- passes: nombre total de passes (self.samples par défaut). La passe i utilise l'échantillon i de self.sampler.
+		- packet: trace les passes avec traceRays au lieu de traceRay.
+		- previewPath: image enregistrée avec save toutes les previewInterval passes et à la fin.
+		- checkpointPath: fichier .npz où l'accumulation est sauvegardée toutes les checkpointInterval passes.
+		  S'il existe au lancement, le rendu reprend là où il s'était arrêté, à condition d'avoir été écrit avec les mêmes
+		  réglages (voir checkpointParameters): sinon ValueError, pour ne pas moyenner des échantillons sans rapport.
+		"""
+		if passes is None:
+			passes = self.samples
+
+		self.accumulation.fill(0)
+		self.sampleCount.fill(0)
+
+		parameters = self.checkpointParameters(scene, passes) if checkpointPath is not None else None
+
+		if checkpointPath is not None and os.path.exists(checkpointPath):
+			self.loadCheckpoint(checkpointPath, parameters)
+
+		y, x = np.mgrid[0:self.height, 0:self.width]
+		x = x.ravel().astype(np.float64)
+		y = y.ravel().astype(np.float64)
+
+		done = int(self.sampleCount.min())
+
+		for index in range(done, passes):
+			# Anti-aliasing: chaque passe prend l'échantillon suivant de chaque pixel
+			offsets = self.sampler.offsets(x, y, index) - 0.5
+			colors = self.tracePixels(scene, x + offsets[:, 0], y + offsets[:, 1], packet)
+
+			self.accumulation += colors.reshape(self.height, self.width, 3)
+			self.sampleCount += 1
+			self.output[:] = self.accumulation / self.sampleCount[..., None]
+
+			last = index + 1 == passes
+
+			if previewPath is not None and ((index + 1) % previewInterval == 0 or last):
+				self.save(previewPath)
+
+			if checkpointPath is not None and ((index + 1) % checkpointInterval == 0 or last):
+				self.saveCheckpoint(checkpointPath, parameters)
+
+	@profiled()
+	def renderAdaptive(self, scene: Scene, threshold: float = ADAPTIVE_THRESHOLD, minSamples: int = MIN_SAMPLES, maxSamples: int = MAX_SAMPLES, packet: bool = False) -> None:
+		"""
+		Anti-aliasing adaptatif: après minSamples échantillons par pixel, seuls les pixels dont l'erreur estimée
+		(écart type de la moyenne, sur le canal le plus bruité) dépasse threshold reçoivent de nouveaux échantillons,
+		jusqu'à maxSamples. La moyenne et la variance sont suivies par pixel avec l'algorithme de Welford, dans sa
+		forme par lots (Chan et al.): chaque tour double le nombre d'échantillons des pixels encore actifs, ce qui
+		limite le nombre d'appels de traceRays pour les quelques pixels qui vont jusqu'au budget maximal.
+		Le nombre d'échantillons de chaque pixel est disponible dans self.sampleCount.
+		"""
+		if not 2 <= minSamples <= maxSamples:
+			raise ValueError("Adaptive sampling needs 2 <= minSamples <= maxSamples")
+
+		self.accumulation.fill(0)
+		self.sampleCount.fill(0)
+
+		y, x = np.mgrid[0:self.height, 0:self.width]
+		x = x.ravel().astype(np.float64)
+		y = y.ravel().astype(np.float64)
+
+		# Statistiques de Welford par pixel: moyenne courante et somme des carrés des écarts
+		count = np.zeros(len(x), dtype=np.int32)
+		mean = np.zeros((len(x), 3), dtype=np.float64)
+		squaredDeviations = np.zeros((len(x), 3), dtype=np.float64)
+		active = np.arange(len(x))
+		batch = np.full(len(x), minSamples)
+
+		while len(active):
+			pixels = np.repeat(active, batch)
+			owner = np.repeat(np.arange(len(active)), batch)
+			index = count[pixels] + np.arange(len(pixels)) - np.repeat(np.cumsum(batch) - batch, batch)
+
+			offsets = self.sampler.offsets(x[pixels], y[pixels], index) - 0.5
+			colors = self.tracePixels(scene, x[pixels] + offsets[:, 0], y[pixels] + offsets[:, 1], packet)
+
+			# Moyenne et somme des carrés des écarts du lot, puis fusion avec les statistiques du pixel
+			batchMean = np.stack([np.bincount(owner, colors[:, c], len(active)) for c in range(3)], axis=1) / batch[:, None]
+			batchDeviations = np.stack([np.bincount(owner, (colors[:, c] - batchMean[owner, c]) ** 2, len(active)) for c in range(3)], axis=1)
+
+			n = count[active, None]
+			total = n + batch[:, None]
+			delta = batchMean - mean[active]
+			mean[active] += delta * batch[:, None] / total
+			squaredDeviations[active] += batchDeviations + delta ** 2 * n * batch[:, None] / total
+			count[active] = total[:, 0]
+
+			# Erreur type de la moyenne des pixels qui ont encore du budget
+			candidates = active[count[active] < maxSamples]
+			n = count[candidates, None]
+			error = np.sqrt(squaredDeviations[candidates] / (n - 1) / n).max(axis=1)
+			active = candidates[error > threshold]
+			batch = np.minimum(count[active], maxSamples - count[active])
+
+		self.sampleCount[:] = count.reshape(self.height, self.width)
+		self.accumulation[:] = (mean * count[:, None]).reshape(self.height, self.width, 3)
+		self.output[:] = mean.reshape(self.height, self.width, 3)
+
+	def tracePixels(self, scene: Scene, x: np.ndarray, y: np.ndarray, packet: bool = False) -> np.ndarray:
+		"""Trace un rayon primaire par coordonnée (x, y) de l'écran et renvoie les couleurs (N,3), par paquets ou rayon par rayon."""
+		if not packet and self.heatmap is None:
+			return np.array([tuple(self.traceRay(scene, self.camera.ray(float(i), float(j)))) for i, j in zip(x, y)], dtype=np.float64).reshape(-1, 3)
+
+		if not packet:
+			colors = np.zeros((len(x), 3), dtype=np.float64)
+
+			for k, (i, j) in enumerate(zip(x.tolist(), y.tolist())):
+				# Les coordonnées sont décalées d'au plus un demi-pixel autour du centre du pixel
+				start = self.stats.counters()
+				colors[k] = tuple(self.traceRay(scene, self.camera.ray(i, j)))
+				self.heatmap[int(j + 0.5), int(i + 0.5)] += self.stats.counters() - start
+
+			return colors
+
+		self.checkHeatmap()
+
+		colors = np.zeros((len(x), 3), dtype=np.float64)
+
+		for start in range(0, len(x), self.packetSize):
+			packet = slice(start, start + self.packetSize)
+			origins, directions = self.camera.rayPacket(x[packet], y[packet])
+			colors[packet] = self.traceRays(scene, origins, directions)
+
+		return colors
+
+	def checkHeatmap(self) -> None:
+		# Les paquets mélangent les rayons de tous les pixels: leur coût ne peut pas être attribué pixel par pixel
+		if self.heatmap is not None:
+			raise ValueError("Heatmaps are only recorded by the scalar path, render without packets")
+
+	def checkpointParameters(self, scene: Scene, passes: int) -> dict:
+		"""Réglages dont dépend l'accumulation du rendu progressif, enregistrés dans ses checkpoints (sérialisables en JSON)."""
+		camera = self.camera
+
+		return {
+			"scene": scene.fingerprint(),
+			"camera": np.concatenate((camera._origin, camera._corner, camera._pixel_delta_u, camera._pixel_delta_v)).tolist(),
+			"sampler": self.sampler.parameters(),
+			"passes": passes,
+			"maxDepth": self.maxDepth,
+			"minWeight": self.minWeight,
+			"russianRoulette": self.russianRoulette,
+			"lightSamples": self.lightSamples,
+		}
+
+	def saveCheckpoint(self, path: str, parameters: Optional[dict] = None) -> None:
+		"""Sauvegarde l'accumulation du rendu progressif. Le fichier est remplacé d'un coup pour ne jamais être laissé à moitié écrit."""
+		temporary = f"{path}.{os.getpid()}.tmp"
+
+		with open(temporary, "wb") as file:
+			np.savez(file, accumulation=self.accumulation, sampleCount=self.sampleCount, parameters=np.array(json.dumps(parameters)))
+
+		os.replace(temporary, path)
+
+	def loadCheckpoint(self, path: str, parameters: Optional[dict] = None) -> None:
+		"""Reprend l'accumulation d'un checkpoint. Avec parameters, refuse (ValueError) un checkpoint écrit avec d'autres réglages."""
+		with np.load(path) as checkpoint:
+			accumulation = checkpoint["accumulation"]
+			sampleCount = checkpoint["sampleCount"]
+			saved = json.loads(str(checkpoint["parameters"])) if "parameters" in checkpoint else None
+
+		if accumulation.shape != (self.height, self.width, 3):
+			raise ValueError(f"Checkpoint {path} is {accumulation.shape[1]}x{accumulation.shape[0]}, expected {self.width}x{self.height}")
+
+		if parameters is not None:
+			if saved is None:
+				raise ValueError(f"Checkpoint {path} does not record its render parameters, delete it to start over")
+
+			# Aller-retour JSON des réglages courants: les tuples deviennent des listes comme dans le fichier
+			different = [name for name, value in json.loads(json.dumps(parameters)).items() if saved.get(name) != value]
+
+			if different:
+				raise ValueError(f"Checkpoint {path} was rendered with a different {', '.join(different)}, delete it to start over")
+
+		self.accumulation = accumulation.astype(np.float64)
+		self.sampleCount = sampleCount.astype(np.int32)
+		self.output[:] = self.accumulation / np.maximum(self.sampleCount, 1)[..., None]
+
+	@profiled(None)
+	def renderParallel(self, createScene: Callable[[Scene], None], workers: Optional[int] = None, tileSize: int = TILE_SIZE, packet: bool = False) -> None:
+		"""
+		Rendu multi-processus: l'image est découpée en tuiles de tileSize pixels distribuées à un pool de processus.
+		createScene doit être une fonction de niveau module (comme les fonctions de src/scenes): chaque processus
+		construit sa propre scène une seule fois, au lieu de recevoir la scène sérialisée à chaque tuile.
+		"""
+		if tileSize < 1:
+			raise ValueError("Tile size must be at least 1")
+
+		if workers is None:
+			workers = os.cpu_count() or 1
+
+		tiles = [
+			(x, y, min(tileSize, self.width - x), min(tileSize, self.height - y))
+			for y in range(0, self.height, tileSize)
+			for x in range(0, self.width, tileSize)
+		]
+
+		initArgs = (createScene, self.camera, self.width, self.height, self.samples, self.maxDepth, self.packetSize, self.sampler, self.stats is not None, self.heatmap is not None, self.minWeight, self.russianRoulette, self.lightSamples)
+
+		with Pool(workers, initializer=_initWorker, initargs=initArgs) as pool:
+			# Les tuiles sont assemblées dans la sortie au fur et à mesure qu'elles sont terminées
+			for x, y, tile, report, heatmap in pool.imap_unordered(partial(_renderTile, packet=packet), tiles):
+				self.output[y:y + tile.shape[0], x:x + tile.shape[1]] = tile
+
+				if report is not None:
+					self.stats.merge(report)
+
+				if heatmap is not None:
+					self.heatmap[y:y + tile.shape[0], x:x + tile.shape[1]] = heatmap
+
 	def computePixelColor(self, scene: Scene, x: float, y: float) -> vec3:
+		"""Couleur de l'échantillon à la position (x, y) de l'écran, déjà décalée dans le pixel par le sampler."""
 		color = vec3(0, 0, 0) # Noir
 
-		# Supersampling anti-aliasing
-		if self.samples > 1:
-			x += random() - 0.5
-			y += random() - 0.5
-			
 		ray = self.camera.ray(x, y)
 		color += self.traceRay(scene, ray)
 
 		return color
 	
-	def traceRay(self, scene: Scene, ray: Ray, depth: int = 0) -> vec3:
+	def traceRay(self, scene: Scene, ray: Ray, depth: int = 0, weight: Optional[vec3] = None) -> vec3:
+		"""
+		Couleur vue par le rayon. weight est le poids RGB du rayon dans la couleur du pixel (produit des coefficients de
+		Fresnel, de réflexion et de teinte le long du chemin, 1 par défaut): les rebonds trop faibles pour être visibles
+		sont arrêtés.
+		"""
 		color = vec3(0, 0, 0) # Noir par défaut
 
+		if weight is None:
+			weight = vec3(1)
+
 		if depth < self.maxDepth:
-			object, t = self.findClosestObject(scene, ray)
+			object, hit = self.findClosestObject(scene, ray)
 
 			if object:
-				intersection = ray.origin + t * ray.direction
-				normal = object.getNormal(intersection)
+				material = object.material
+				intersection = ray.origin + hit.t * ray.direction
+				normal = hit.normal
 				viewDir = -ray.direction
 				
 				# Materiaux transparents (verre, eau)
-				if object.material.refractivity > 0 and object.material.IOR > 1.0:
+				if material.refractivity > 0 and material.IOR > 1.0:
 					# Calculer le coefficient de Fresnel
-					fresnel = self.fresnel(ray.direction, normal, object.material.IOR)
+					fresnel = self.fresnel(ray.direction, normal, material.IOR)
 					
+					# Poids des deux branches dans la couleur du pixel
+					reflected_weight = weight * (fresnel * material.refractivity)
+					refracted_weight = weight * ((1 - fresnel) * material.refractivity) * material.diffuse_color
+
 					# Calculer les contributions de réflexion et de réfraction
-					reflected_contribution = self.reflectRay(scene, ray, object, intersection, normal, depth)
-					refracted_contribution = self.refractRay(scene, ray, object, intersection, normal, depth)
+					reflected_contribution = self.reflectRay(scene, ray, object, intersection, normal, depth, reflected_weight)
+					refracted_contribution = self.refractRay(scene, ray, object, intersection, normal, depth, refracted_weight)
 					
 					# Donner la tinte de couleur du matériau réfractif
-					refracted_contribution *= object.material.diffuse_color
+					refracted_contribution *= material.diffuse_color
 					
 					# Mélanger les contributions de réflexion et de réfraction avec Fresnel
 					fresnel_color = reflected_contribution * fresnel + refracted_contribution * (1 - fresnel)
 
-					color += fresnel_color * object.material.refractivity
+					color += fresnel_color * material.refractivity
 				
 				# Materiaux reflectifs (miroir et metaux)
-				elif object.material.reflectivity > 0:
-					reflected_color = self.reflectRay(scene, ray, object, intersection, normal, depth)
+				elif material.reflectivity > 0:
+					reflected_weight = weight * material.reflectivity * material.specular_color
+					reflected_color = self.reflectRay(scene, ray, object, intersection, normal, depth, reflected_weight)
 					
 					# Teinter les réflexions par la couleur du métal (or, cuivre, etc.)
-					reflected_color *= object.material.specular_color
+					reflected_color *= material.specular_color
 
-					color += reflected_color * object.material.reflectivity
+					color += reflected_color * material.reflectivity
 				
 				# Materiaux diffus (plastique, bois)
-				if object.material.diffuse > 0:
+				if material.diffuse > 0:
 					# Prendre en compte la lumière ambiante
-					diffuse_color = object.material.diffuse_color * AMBIANT_LIGHT
+					diffuse_color = material.diffuse_color * AMBIANT_LIGHT
 
-					# Ajouter la contribution de chaque source lumineuse
-					for light in scene.lights:
-						diffuse_color += light.getContribution(scene.objects, object, intersection, viewDir)
+					# Ajouter la contribution de chaque source lumineuse assez proche (ou tirée), pondérée
+					for light, lightWeight in scene.lightTable.lightsAt(intersection, self.lightSamples, self.sampler.seed):
+						diffuse_color += light.getContribution(scene, object, intersection, normal, viewDir) * lightWeight
 
-					color += diffuse_color * object.material.diffuse
+					color += diffuse_color * material.diffuse
 
 		return color
 	
-	def findClosestObject(self, scene: Scene, ray: Ray) -> tuple[Optional[Object], float]:
-		t = float("inf")
-		object = None
+	def findClosestObject(self, scene: Scene, ray: Ray) -> tuple[Optional[Object], Optional[Hit]]:
+		# Trouver l'objet le plus proche via la structure d'accélération de la scène
+		return scene.intersect(ray)
+
+	def traceRays(self, scene: Scene, origins: np.ndarray, directions: np.ndarray, depth: int = 0, weights: Optional[np.ndarray] = None) -> np.ndarray:
+		"""
+		Équivalent vectorisé de traceRay pour un paquet de rayons (N,3), de poids RGB weights (N,3) (1 par défaut).
+		Moteur wavefront: au lieu de la récursion de traceRay, les rayons en attente forment une file (RayQueue) traitée
+		génération par génération. Chaque génération est intersectée et ombrée en bloc, ajoute sa lumière directe à la
+		couleur de son pixel pondérée par le poids du rayon, et émet les rayons réfléchis et réfractés de la suivante.
+		"""
+		colors = np.zeros(directions.shape, dtype=np.float64)
+
+		if depth >= self.maxDepth or len(directions) == 0:
+			return colors
+
+		if weights is None:
+			weights = np.ones(directions.shape, dtype=np.float64)
+
+		queue = RayQueue(origins, directions, weights, np.full(len(directions), depth), np.arange(len(directions)))
+
+		while len(queue):
+			queue = self.traceGeneration(scene, queue, colors)
+
+		return colors
+
+	def traceGeneration(self, scene: Scene, queue: RayQueue, colors: np.ndarray) -> RayQueue:
+		"""Intersecte et ombre une génération de rayons, ajoute leur lumière directe à colors et renvoie la génération suivante."""
+		indices, t, primitives = self.findClosestObjects(scene, queue.origins, queue.directions)
+		hit = indices >= 0
+
+		rays = queue.select(hit)
+		indices, t, primitives = indices[hit], t[hit], primitives[hit]
+		D, W = rays.directions, rays.weights
+
+		intersections = rays.origins + t[:, None] * D
+		viewDirs = -D
+
+		# Seules les normales dépendent de la forme de l'objet
+		normals = np.empty(intersections.shape, dtype=np.float64)
+
+		for i in np.unique(indices):
+			object = indices == i
+			normals[object] = scene.objects[i].getNormalPacket(intersections[object], primitives[object])
+
+		# Paramètres du matériau de chaque impact, lus dans les tables de la scène
+		materials = scene.materials[scene.materialIds[indices]]
+		emitted = []
+
+		# Materiaux transparents (verre, eau)
+		glass = (materials.refractivity > 0) & (materials.IOR > 1.0)
+
+		if glass.any():
+			incident, IOR, refractivity = rays.select(glass), materials.IOR[glass], materials.refractivity[glass]
+			fresnel = self.fresnelPacket(D[glass], normals[glass], IOR)
+
+			# La réfraction est teintée par la couleur du matériau
+			reflected_weights = W[glass] * (fresnel * refractivity)[:, None]
+			refracted_weights = W[glass] * ((1 - fresnel) * refractivity)[:, None] * materials.diffuse_color[glass]
+
+			emitted.append(self.reflectRays(incident, intersections[glass], normals[glass], reflected_weights))
+			emitted.append(self.refractRays(incident, IOR, intersections[glass], normals[glass], refracted_weights))
+
+		# Materiaux reflectifs (miroir et metaux)
+		mirror = ~glass & (materials.reflectivity > 0)
+
+		if mirror.any():
+			reflected_weights = W[mirror] * materials.reflectivity[mirror, None] * materials.specular_color[mirror]
+			emitted.append(self.reflectRays(rays.select(mirror), intersections[mirror], normals[mirror], reflected_weights))
+
+		# Materiaux diffus (plastique, bois)
+		diffuse = materials.diffuse > 0
+
+		if diffuse.any():
+			shaded = materials[diffuse]
+			# Toutes les lumières en une passe
+			diffuse_color = shaded.diffuse_color * AMBIANT_LIGHT + scene.lightTable.evaluate(scene, shaded, intersections[diffuse], normals[diffuse], viewDirs[diffuse], self.lightSamples, self.sampler.seed)
+
+			# Un pixel peut recevoir plusieurs rayons de la même génération (réflexion et réfraction)
+			np.add.at(colors, rays.pixels[diffuse], W[diffuse] * diffuse_color * shaded.diffuse[:, None])
+
+		return RayQueue.concatenate(emitted)
+
+	def findClosestObjects(self, scene: Scene, origins: np.ndarray, directions: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+		"""Renvoie pour chaque rayon l'indice de l'objet le plus proche (-1 si aucun), la distance et la primitive touchée."""
+		return scene.intersectPacket(origins, directions)
+
+	def reflectRays(self, rays: RayQueue, intersections: np.ndarray, normals: np.ndarray, weights: np.ndarray) -> RayQueue:
+		"""Rayons réfléchis de poids weights aux points d'intersection des rayons incidents rays."""
+		directions = rays.directions
+
+		# S'assurer que les normales font face aux rayons incidents
+		normals = np.where((np.einsum("ij,ij->i", directions, normals) > 0)[:, None], -normals, normals)
+
+		reflected = directions - 2.0 * np.einsum("ij,ij->i", normals, directions)[:, None] * normals
+		reflected /= np.linalg.norm(reflected, axis=1, keepdims=True)
 
-		# Trouver l'objet le plus proche
-		for obj in scene.objects:
-			new_t = obj.hit(ray)
+		# Décaler les origines pour éviter l'auto-intersection
+		return self.emitRays(RayQueue(intersections + EPSILON * normals, reflected, weights, rays.depths + 1, rays.pixels))
 
-			if new_t and new_t < t:
-				object = obj
-				t = new_t
+	def refractRays(self, rays: RayQueue, ior: np.ndarray, intersections: np.ndarray, normals: np.ndarray, weights: np.ndarray) -> RayQueue:
+		"""Rayons réfractés de poids weights (indice de réfraction ior par rayon), ou réfléchis en cas de réflexion totale interne."""
+		directions = rays.directions
+		cos_theta = np.einsum("ij,ij->i", directions, normals)
 
-		return object, t
+		# Rayons entrants: air vers matériau (eta = 1/IOR), sortants: matériau vers air (eta = IOR)
+		entering = cos_theta < 0
+		eta = np.where(entering, 1.0 / ior, ior)
+		outward_normals = np.where(entering[:, None], normals, -normals)
 
-	def reflectRay(self, scene: Scene, ray: Ray, obj: Object, intersection: vec3, normal: vec3, depth: int) -> vec3:
+		# Loi de Snell (même formule que glm.refract)
+		cos_i = np.einsum("ij,ij->i", outward_normals, directions)
+		k = 1.0 - eta * eta * (1.0 - cos_i * cos_i)
+		refracted = eta[:, None] * directions - (eta * cos_i + np.sqrt(np.maximum(k, 0.0)))[:, None] * outward_normals
+		refracted[k < 0] = 0.0
+
+		emitted = []
+
+		# Réflexion totale interne: émettre la réflexion à la place
+		total_reflection = np.linalg.norm(refracted, axis=1) < EPSILON
+
+		if total_reflection.any():
+			emitted.append(self.reflectRays(rays.select(total_reflection), intersections[total_reflection], normals[total_reflection], weights[total_reflection]))
+
+		transmitted = ~total_reflection
+
+		if transmitted.any():
+			refracted = refracted[transmitted] / np.linalg.norm(refracted[transmitted], axis=1, keepdims=True)
+			refraction_origins = intersections[transmitted] - EPSILON * outward_normals[transmitted]
+			emitted.append(self.emitRays(RayQueue(refraction_origins, refracted, weights[transmitted], rays.depths[transmitted] + 1, rays.pixels[transmitted])))
+
+		return RayQueue.concatenate(emitted)
+
+	def emitRays(self, rays: RayQueue) -> RayQueue:
+		"""Garde les rayons secondaires à tracer: sous la profondeur maximale et survivants (voir survivalPacket), poids ajustés."""
+		rays = rays.select(rays.depths < self.maxDepth)
+		factors = self.survivalPacket(rays.weights, rays.origins, rays.directions)
+		alive = factors > 0.0
+
+		if not alive.all():
+			rays = rays.select(alive)
+			factors = factors[alive]
+
+		rays.weights = rays.weights * factors[:, None]
+
+		return rays
+
+	def fresnelPacket(self, incident: np.ndarray, normals: np.ndarray, ior: np.ndarray) -> np.ndarray:
+		"""Version vectorisée de fresnel (approximation de Schlick), ior étant l'indice de chaque rayon ou commun à tous."""
+		cos_i = np.einsum("ij,ij->i", incident, normals)
+		entering = cos_i < 0
+
+		sin_t2 = ior * ior * (1.0 - cos_i * cos_i)
+		total_reflection = ~entering & (sin_t2 > 1.0)
+
+		cos_i = np.where(entering, -cos_i, np.sqrt(np.maximum(1.0 - sin_t2, 0.0)))
+		r0 = ((1.0 - ior) / (1.0 + ior)) ** 2
+
+		return np.where(total_reflection, 1.0, r0 + (1.0 - r0) * ((1.0 - cos_i) ** 5))
+
+	def reflectRay(self, scene: Scene, ray: Ray, obj: Object, intersection: vec3, normal: vec3, depth: int, weight: Optional[vec3] = None) -> vec3:
 		# S'assurer que la normale fait face au rayon incident
 		if glm.dot(ray.direction, normal) > 0:
 			normal = -normal
@@ -137,9 +614,9 @@ class Renderer:
 		reflection_origin = intersection + EPSILON * normal
 		reflection = Ray(reflection_origin, vec3(direction))
 
-		return self.traceRay(scene, reflection, depth + 1)
+		return self.traceSecondaryRay(scene, reflection, depth, weight)
 	
-	def refractRay(self, scene: Scene, ray: Ray, obj: Object, intersection: vec3, normal: vec3, depth: int) -> vec3:
+	def refractRay(self, scene: Scene, ray: Ray, obj: Object, intersection: vec3, normal: vec3, depth: int, weight: Optional[vec3] = None) -> vec3:
 		# Determine if we're entering or exiting the object
 		cos_theta = glm.dot(glm.normalize(ray.direction), normal)
 		
@@ -160,13 +637,65 @@ class Renderer:
 		# Check for total internal reflection (refract returns zero vector)
 		if glm.length(direction) < EPSILON:
 			# Total internal reflection - return reflection instead
-			return self.reflectRay(scene, ray, obj, intersection, normal, depth)
+			return self.reflectRay(scene, ray, obj, intersection, normal, depth, weight)
 		
 		# Offset origin to avoid self-intersection (in opposite direction from reflection)
 		refraction_origin = intersection - EPSILON * outward_normal
 		refraction = Ray(refraction_origin, direction)
 		
-		return self.traceRay(scene, refraction, depth + 1)
+		return self.traceSecondaryRay(scene, refraction, depth, weight)
+
+	def traceSecondaryRay(self, scene: Scene, ray: Ray, depth: int, weight: Optional[vec3]) -> vec3:
+		"""Trace un rayon réfléchi ou réfracté s'il survit (voir survival), sa couleur est alors multipliée par le facteur de survie."""
+		if weight is None:
+			weight = vec3(1)
+
+		factor = self.survival(weight, ray)
+
+		if factor == 0.0:
+			return vec3(0, 0, 0)
+
+		return self.traceRay(scene, ray, depth + 1, weight * factor) * factor
+
+	def survival(self, weight: vec3, ray: Ray) -> float:
+		"""
+		Facteur appliqué à la couleur d'un rayon secondaire de poids weight: 1 à partir de minWeight. En dessous, 0
+		(rayon abandonné, biais de moins de minWeight fois la luminance perdue) ou, avec la roulette russe, 1/p avec la
+		probabilité p = poids / minWeight et 0 sinon, ce qui conserve l'espérance de la couleur. Le tirage est un hachage
+		du rayon et de la graine du sampler: le rendu reste reproductible. Le poids d'un rayon RGB est sa composante maximale.
+		"""
+		strength = glm.max(weight)
+
+		if strength >= self.minWeight:
+			return 1.0
+
+		if not self.russianRoulette:
+			return 0.0
+
+		probability = strength / self.minWeight
+		bits = struct.unpack("6i", struct.pack("6f", *ray.origin, *ray.direction))
+
+		return 1.0 / probability if hashFloat(*bits, seed=self.sampler.seed) < probability else 0.0
+
+	def survivalPacket(self, weights: np.ndarray, origins: np.ndarray, directions: np.ndarray) -> np.ndarray:
+		"""Version vectorisée de survival, pour des poids RGB (N,3)."""
+		strengths = weights.max(axis=1)
+		factors = np.ones(len(weights))
+		low = strengths < self.minWeight
+
+		if not low.any():
+			return factors
+
+		if not self.russianRoulette:
+			factors[low] = 0.0
+			return factors
+
+		probability = strengths[low] / self.minWeight
+		bits = np.concatenate((origins[low], directions[low]), axis=1).astype(np.float32).view(np.int32)
+		survives = hashFloats(*bits.T, seed=self.sampler.seed) < probability
+		factors[low] = np.where(survives, 1.0 / np.maximum(probability, 1e-300), 0.0)
+
+		return factors
 	
 	def fresnel(self, incident: vec3, normal: vec3, ior: float) -> float:
 		# Calculer l'angle d'incidence
@@ -195,9 +724,22 @@ class Renderer:
 		self.camera.resize(width, height)
 
 		self.output = np.zeros((self.height, self.width, 3), dtype=np.float32)
+		self.accumulation = np.zeros((self.height, self.width, 3), dtype=np.float64)
+		self.sampleCount = np.zeros((self.height, self.width), dtype=np.int32)
+
+		if self.heatmap is not None:
+			self.heatmap = np.zeros((self.height, self.width, len(HEATMAP_CHANNELS)), dtype=np.float64)
 
 	def clear(self) -> None:
 		self.output.fill(0)
+		self.accumulation.fill(0)
+		self.sampleCount.fill(0)
+
+		if self.heatmap is not None:
+			self.heatmap.fill(0)
+
+		if self.stats is not None:
+			self.stats.reset()
 
 	def save(self, path: Optional[str] = None) -> None:
 		if path is None:
@@ -207,4 +749,18 @@ class Renderer:
 
 		rgb_image = (np.clip(self.output, 0.0,1.0) * 255.0).astype(np.uint8)
 		image = Image.fromarray(rgb_image)
-		image.save(path)
\ No newline at end of file
+		image.save(path)
+
+		if self.heatmap is not None:
+			self.saveHeatmap(path)
+
+	def saveHeatmap(self, path: str) -> None:
+		"""
+		Enregistre à côté de l'image path la heatmap brute (<nom>.heatmap.npy, canaux HEATMAP_CHANNELS)
+		et une image en fausses couleurs par canal (<nom>.rays.png, <nom>.tests.png, <nom>.time.png).
+		"""
+		base = os.path.splitext(path)[0]
+		np.save(f"{base}.heatmap.npy", self.heatmap)
+
+		for channel, name in enumerate(HEATMAP_CHANNELS):
+			Image.fromarray(falseColour(self.heatmap[..., channel])).save(f"{base}.{name}.png")
\ No newline at end of file
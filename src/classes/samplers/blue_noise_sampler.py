@@ -0,0 +1,61 @@
+import numpy as np
+from classes.samplers.sampler import Sampler, hashFloats
+
+# Suite R2 (Roberts): incréments des deux dimensions, dérivés du nombre plastique
+R2 = (0.7548776662466927, 0.5698402909980532)
+
+def blueNoiseTile(size: int, seed: int = 0, sigma: float = 1.5) -> np.ndarray:
+	"""
+	Génère une tuile (size, size) de bruit bleu dans [0, 1) avec la méthode void-and-cluster: les pixels sont classés en
+	plaçant chaque nouveau point dans le plus grand vide des points précédents (énergie gaussienne torique minimale).
+	Des rangs voisins sont donc éloignés dans la tuile, ce qui repousse l'erreur vers les hautes fréquences.
+	"""
+	offsets = np.minimum(np.arange(size), size - np.arange(size)).astype(np.float64)
+	kernel = np.exp(-(offsets[:, None] ** 2 + offsets[None, :] ** 2) / (2 * sigma ** 2))
+
+	# Légère énergie initiale aléatoire pour départager les vides de même taille
+	energy = hashFloats(np.arange(size)[:, None], np.arange(size)[None, :], seed=seed) * 1e-6
+	ranks = np.zeros((size, size), dtype=np.int64)
+
+	for rank in range(size * size):
+		index = int(np.argmin(energy))
+		y, x = divmod(index, size)
+		ranks[y, x] = rank
+		energy += np.roll(np.roll(kernel, y, axis=0), x, axis=1)
+		energy[y, x] = np.inf
+
+	return (ranks + 0.5) / (size * size)
+
+class BlueNoiseSampler(Sampler):
+	"""
+	Tuiles de bruit bleu répétées sur l'image, une par dimension, pour le premier échantillon de chaque pixel,
+	puis décalées à chaque échantillon suivant par la suite R2. L'erreur d'un échantillon par pixel est
+	répartie en bruit haute fréquence, bien moins visible que le bruit blanc, et les échantillons d'un même pixel
+	restent à faible discrépance.
+	"""
+	size: int
+
+	_tiles: dict = {} # Tuiles déjà générées, par (taille, graine)
+
+	def __init__(self, seed: int = 0, size: int = 64) -> None:
+		super().__init__(seed)
+		self.size = size
+
+	def tiles(self) -> tuple[np.ndarray, np.ndarray]:
+		key = (self.size, self.seed)
+
+		if key not in BlueNoiseSampler._tiles:
+			BlueNoiseSampler._tiles[key] = (blueNoiseTile(self.size, 2 * self.seed), blueNoiseTile(self.size, 2 * self.seed + 1))
+
+		return BlueNoiseSampler._tiles[key]
+
+	def offsets(self, x: np.ndarray, y: np.ndarray, sample: np.ndarray) -> np.ndarray:
+		tileU, tileV = self.tiles()
+		x = np.asarray(x, dtype=np.int64) % self.size
+		y = np.asarray(y, dtype=np.int64) % self.size
+		sample = np.asarray(sample, dtype=np.float64)
+
+		u = tileU[y, x] + sample * R2[0]
+		v = tileV[y, x] + sample * R2[1]
+
+		return np.stack(np.broadcast_arrays(u % 1.0, v % 1.0), axis=-1)
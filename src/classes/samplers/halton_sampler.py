@@ -0,0 +1,28 @@
+import numpy as np
+from classes.samplers.sampler import Sampler, hashFloats
+
+def radicalInverse(index: np.ndarray, base: int) -> np.ndarray:
+	"""Inverse radical de index en base base: les chiffres sont reflétés de l'autre côté de la virgule."""
+	index = np.asarray(index, dtype=np.int64).copy()
+	result = np.zeros(index.shape, dtype=np.float64)
+	scale = 1.0 / base
+
+	while np.any(index > 0):
+		result += (index % base) * scale
+		index //= base
+		scale /= base
+
+	return result
+
+class HaltonSampler(Sampler):
+	"""
+	Suite de Halton en bases 2 et 3, à faible discrépance: les échantillons successifs d'un pixel remplissent
+	l'espace régulièrement. Chaque pixel décale la suite d'une rotation aléatoire (Cranley-Patterson) pour que
+	les motifs ne se répètent pas d'un pixel à l'autre.
+	"""
+
+	def offsets(self, x: np.ndarray, y: np.ndarray, sample: np.ndarray) -> np.ndarray:
+		u = radicalInverse(sample, 2) + hashFloats(x, y, 0, seed=self.seed)
+		v = radicalInverse(sample, 3) + hashFloats(x, y, 1, seed=self.seed)
+
+		return np.stack(np.broadcast_arrays(u % 1.0, v % 1.0), axis=-1)
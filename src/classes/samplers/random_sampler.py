@@ -0,0 +1,8 @@
+import numpy as np
+from classes.samplers.sampler import Sampler, hashFloats
+
+class RandomSampler(Sampler):
+	"""Positions uniformes indépendantes, tirées d'un hachage de (pixel, échantillon) plutôt que d'un état global."""
+
+	def offsets(self, x: np.ndarray, y: np.ndarray, sample: np.ndarray) -> np.ndarray:
+		return np.stack([hashFloats(x, y, sample, 0, seed=self.seed), hashFloats(x, y, sample, 1, seed=self.seed)], axis=-1)
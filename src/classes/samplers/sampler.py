@@ -0,0 +1,64 @@
+from abc import ABC, abstractmethod
+import numpy as np
+
+def hashValues(*values, seed: int = 0) -> np.ndarray:
+	"""
+	Hache des tableaux d'entiers (diffusés ensemble) en entiers 64 bits pseudo-aléatoires (mélangeur de splitmix64).
+	Le résultat ne dépend que des valeurs et de la graine: les mêmes (pixel, échantillon) donnent toujours le même nombre.
+	"""
+	arrays = np.broadcast_arrays(*(np.asarray(value, dtype=np.int64) for value in values))
+	h = np.full(arrays[0].shape, seed, dtype=np.uint64)
+
+	with np.errstate(over="ignore"):
+		for value in arrays:
+			h = h ^ (value.astype(np.uint64) + np.uint64(0x9E3779B97F4A7C15) + (h << np.uint64(6)) + (h >> np.uint64(2)))
+			h = (h ^ (h >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+			h = (h ^ (h >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+			h = h ^ (h >> np.uint64(31))
+
+	return h
+
+def hashFloats(*values, seed: int = 0) -> np.ndarray:
+	"""Comme hashValues, mais renvoie des réels uniformes dans [0, 1)."""
+	return (hashValues(*values, seed=seed) >> np.uint64(11)).astype(np.float64) * 2.0 ** -53
+
+def hashFloat(*values: int, seed: int = 0) -> float:
+	"""Version scalaire de hashFloats (même résultat) en entiers Python, bien plus rapide que NumPy pour un seul nombre."""
+	mask = (1 << 64) - 1
+	h = seed & mask
+
+	for value in values:
+		h ^= ((value & mask) + 0x9E3779B97F4A7C15 + (h << 6) + (h >> 2)) & mask
+		h = ((h ^ (h >> 30)) * 0xBF58476D1CE4E5B9) & mask
+		h = ((h ^ (h >> 27)) * 0x94D049BB133111EB) & mask
+		h ^= h >> 31
+
+	return (h >> 11) * 2.0 ** -53
+
+class Sampler(ABC):
+	"""
+	Générateur des positions des échantillons dans les pixels pour l'anti-aliasing.
+	Chaque position ne dépend que du pixel, de l'indice de l'échantillon et de la graine, ce qui rend les rendus
+	reproductibles quels que soient l'ordre, le découpage en tuiles ou le nombre de processus.
+	"""
+	seed: int
+
+	def __init__(self, seed: int = 0) -> None:
+		self.seed = seed
+
+	@abstractmethod
+	def offsets(self, x: np.ndarray, y: np.ndarray, sample: np.ndarray) -> np.ndarray:
+		"""
+		Renvoie les positions (..., 2) dans [0, 1)² des échantillons d'indice sample des pixels (x, y).
+		Les trois tableaux d'entiers sont diffusés ensemble, ce qui permet de générer une tuile entière en un appel.
+		"""
+		pass
+
+	def parameters(self) -> dict:
+		"""Type et réglages du sampler (ses attributs publics), enregistrés avec les checkpoints du rendu progressif."""
+		return {"type": type(self).__name__, **{name: value for name, value in vars(self).items() if not name.startswith("_")}}
+
+	def tileOffsets(self, x: np.ndarray, y: np.ndarray, samples: int, firstSample: int = 0) -> np.ndarray:
+		"""Renvoie les positions (N, samples, 2) des échantillons firstSample à firstSample + samples des N pixels (x, y)."""
+		sample = np.arange(firstSample, firstSample + samples)
+		return self.offsets(np.asarray(x)[:, None], np.asarray(y)[:, None], sample[None, :])
@@ -0,0 +1,34 @@
+import numpy as np
+from classes.samplers.sampler import Sampler, hashValues
+
+# Nombres directeurs des deux premières dimensions de Sobol: l'identité (van der Corput) et la matrice de Pascal modulo 2
+_DIRECTIONS = np.zeros((2, 32), dtype=np.uint64)
+_DIRECTIONS[0] = [1 << (31 - bit) for bit in range(32)]
+_DIRECTIONS[1, 0] = 1 << 31
+for bit in range(1, 32):
+	_DIRECTIONS[1, bit] = _DIRECTIONS[1, bit - 1] ^ (_DIRECTIONS[1, bit - 1] >> np.uint64(1))
+
+class SobolSampler(Sampler):
+	"""
+	Suite de Sobol en deux dimensions, une (0,2)-suite: toute puissance de deux d'échantillons consécutifs est
+	parfaitement stratifiée. Chaque pixel brouille la suite par un XOR aléatoire sur les bits (décalage numérique),
+	qui conserve cette stratification tout en décorrélant les pixels.
+	"""
+
+	def offsets(self, x: np.ndarray, y: np.ndarray, sample: np.ndarray) -> np.ndarray:
+		sample = np.asarray(sample, dtype=np.int64).astype(np.uint64)
+		u = np.zeros(sample.shape, dtype=np.uint64)
+		v = np.zeros(sample.shape, dtype=np.uint64)
+
+		for bit in range(32):
+			mask = ((sample >> np.uint64(bit)) & np.uint64(1)).astype(bool)
+			u = np.where(mask, u ^ _DIRECTIONS[0, bit], u)
+			v = np.where(mask, v ^ _DIRECTIONS[1, bit], v)
+
+			if not np.any(sample >> np.uint64(bit + 1)):
+				break
+
+		u = u ^ (hashValues(x, y, 0, seed=self.seed) >> np.uint64(32))
+		v = v ^ (hashValues(x, y, 1, seed=self.seed) >> np.uint64(32))
+
+		return np.stack([u.astype(np.float64), v.astype(np.float64)], axis=-1) * 2.0 ** -32
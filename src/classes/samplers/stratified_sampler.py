@@ -0,0 +1,29 @@
+import math
+import numpy as np
+from classes.samplers.sampler import Sampler, hashValues, hashFloats
+
+class StratifiedSampler(Sampler):
+	"""
+	Échantillonnage stratifié: le pixel est découpé en une grille de n x n strates (n² >= samples) et chaque échantillon
+	est tiré au hasard dans sa strate. L'ordre des strates est décalé d'un pixel à l'autre pour ne pas corréler les pixels.
+	Au-delà de n² échantillons, les strates sont parcourues à nouveau avec de nouveaux tirages.
+	"""
+	strata: int
+
+	def __init__(self, samples: int, seed: int = 0) -> None:
+		super().__init__(seed)
+
+		if samples < 1:
+			raise ValueError("Samples must be at least 1")
+
+		self.strata = math.ceil(math.sqrt(samples)) # Nombre de strates par axe
+
+	def offsets(self, x: np.ndarray, y: np.ndarray, sample: np.ndarray) -> np.ndarray:
+		n = self.strata
+		shift = hashValues(x, y, seed=self.seed) % np.uint64(n * n)
+		stratum = (np.asarray(sample).astype(np.uint64) + shift) % np.uint64(n * n)
+
+		u = (stratum % np.uint64(n) + hashFloats(x, y, sample, 0, seed=self.seed)) / n
+		v = (stratum // np.uint64(n) + hashFloats(x, y, sample, 1, seed=self.seed)) / n
+
+		return np.stack([u, v], axis=-1)
@@ -1,21 +1,169 @@
 from classes.objects.object import Object
-from classes.lights.light import Light
-from typing import List
+from classes.objects.bvh import TopLevelBVH
+from classes.lights.light import Light, LightTable
+from classes.ray import Ray
+from classes.hit import Hit
+from classes.material import MaterialTable
+from constants import LIGHT_CUTOFF
+from typing import List, Optional
+from pyglm import glm
+import numpy as np
+import hashlib
+import threading
+
+class OccluderCache(threading.local):
+	"""Indice du dernier objet ayant bloqué un rayon d'ombre de chaque lumière, propre à chaque thread."""
+	def __init__(self) -> None:
+		self.occluders: dict[int, Optional[int]] = {}
 
 class Scene:
 	objects: List[Object]
 	lights: List[Light]
 
-	def __init__(self):
+	def __init__(self, lightCutoff: float = LIGHT_CUTOFF):
 		self.objects = []
 		self.lights = []
+		self.lightCutoff = lightCutoff # Voir LightTable
+		self._accelerator = None
+		self._tables = None
+		self._lightTable = None
+		self._occluders = OccluderCache()
 
 	def addObjects(self, *objects: Object) -> None:
 		self.objects.extend(objects) # Ajoute plusieurs objets à la scène
+		self._accelerator = None # La structure d'accélération doit être reconstruite
+		self._tables = None
 
 	def addLights(self, *lights: Light) -> None:
 		self.lights.extend(lights) # Ajoute plusieurs lumières à la scène
+		self._lightTable = None
 
 	def clear(self) -> None:
 		self.objects = []
-		self.lights = []
\ No newline at end of file
+		self.lights = []
+		self._accelerator = None
+		self._tables = None
+		self._lightTable = None
+		self._occluders = OccluderCache()
+
+	@property
+	def accelerator(self) -> TopLevelBVH:
+		# BVH sur les boîtes englobantes des objets, construit à la première requête
+		if self._accelerator is None:
+			self._accelerator = TopLevelBVH(self.objects)
+
+		return self._accelerator
+
+	@property
+	def materials(self) -> MaterialTable:
+		"""Table des matériaux distincts des objets, une ligne par matériau (voir materialIds)."""
+		return self.compile()[0]
+
+	@property
+	def materialIds(self) -> np.ndarray:
+		"""Ligne de materials de chaque objet, indexée comme objects: materials[materialIds[indices]] donne les paramètres de chaque impact."""
+		return self.compile()[1]
+
+	@property
+	def lightTable(self) -> LightTable:
+		"""Lumières sous forme de tableaux et BVH de leurs zones d'influence, pour les évaluer en une passe (LightTable.evaluate)."""
+		if self._lightTable is None:
+			self._lightTable = LightTable(self.lights, self.lightCutoff)
+
+		return self._lightTable
+
+	def compile(self) -> tuple[MaterialTable, np.ndarray]:
+		# Compilées au premier rendu comme la structure d'accélération: les primitives d'un maillage partagent le matériau de leur objet
+		if self._tables is None:
+			rows: dict[int, int] = {}
+			materials = []
+
+			for object in self.objects:
+				if id(object.material) not in rows:
+					rows[id(object.material)] = len(materials)
+					materials.append(object.material)
+
+			ids = np.array([rows[id(object.material)] for object in self.objects], dtype=np.int64)
+			self._tables = (MaterialTable.compile(materials), ids)
+
+		return self._tables
+
+	def fingerprint(self) -> str:
+		"""
+		Empreinte du contenu de la scène: type et attributs numériques (vecteurs, réels, tableaux) de chaque objet,
+		tables des matériaux et des lumières. Deux scènes construites de la même façon ont la même empreinte, ce qui
+		permet de vérifier qu'un checkpoint du rendu progressif appartient bien à la scène rendue.
+		"""
+		digest = hashlib.blake2b(digest_size=16)
+
+		def update(name: str, value) -> None:
+			if isinstance(value, Object):
+				describe(value)
+			elif isinstance(value, np.ndarray) and value.dtype != object:
+				digest.update(f"{name}:{value.dtype}{value.shape}".encode())
+				digest.update(np.ascontiguousarray(value).tobytes())
+			elif isinstance(value, (glm.vec3, int, float)):
+				digest.update(f"{name}={tuple(value) if isinstance(value, glm.vec3) else value!r}".encode())
+			elif isinstance(value, (list, tuple)) and all(isinstance(item, glm.vec3) for item in value):
+				digest.update(f"{name}={[tuple(item) for item in value]}".encode())
+
+		def describe(object: Object) -> None:
+			digest.update(type(object).__name__.encode())
+			names = {name for cls in type(object).__mro__ for name in getattr(cls, "__slots__", ())}
+			names.update(getattr(object, "__dict__", {}))
+
+			# Les matériaux sont comparés par les tables compilées
+			for name in sorted(names - {"material"}):
+				update(name, getattr(object, name, None))
+
+		for object in self.objects:
+			describe(object)
+
+		materials, ids = self.compile()
+		for name in MaterialTable.FIELDS:
+			update(name, getattr(materials, name))
+		update("materialIds", ids)
+
+		table = self.lightTable
+		for name in ("origins", "colors", "intensities", "directions", "angles", "outerAngles", "radii"):
+			update(name, getattr(table, name))
+
+		return digest.hexdigest()
+
+	def intersect(self, ray: Ray) -> tuple[Optional[Object], Optional[Hit]]:
+		"""Renvoie l'objet le plus proche touché par le rayon et son enregistrement d'impact, ou (None, None)."""
+		index, hit = self.accelerator.intersect(ray)
+
+		return (None, None) if index is None else (self.objects[index], hit)
+
+	def occluded(self, ray: Ray, maxDistance: float, light: Optional[Light] = None) -> bool:
+		"""
+		Indique si un objet coupe le rayon avant maxDistance. Pour un rayon d'ombre de light, l'objet qui a bloqué le
+		rayon d'ombre précédent de cette lumière est testé avant la structure d'accélération: des points voisins sont
+		souvent cachés par le même objet.
+		"""
+		if light is None:
+			return self.accelerator.occluded(ray, maxDistance)
+
+		occluders = self._occluders.occluders
+		last = occluders.get(id(light))
+
+		if last is not None and self.lastOccluderBlocks(last, ray, maxDistance):
+			return True
+
+		# Un point éclairé vide le cache: les points éclairés voisins ne testent pas d'objet en vain
+		last = occluders[id(light)] = self.accelerator.occluder(ray, maxDistance)
+
+		return last is not None
+
+	def lastOccluderBlocks(self, index: int, ray: Ray, maxDistance: float) -> bool:
+		"""Indique si l'objet d'indice index, dernier à avoir bloqué la lumière, coupe aussi ce rayon avant maxDistance."""
+		return self.objects[index].occludes(ray, maxDistance)
+
+	def intersectPacket(self, origins: np.ndarray, directions: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+		"""Renvoie pour chaque rayon l'indice de l'objet le plus proche (-1 si aucun), la distance et la primitive touchée."""
+		return self.accelerator.intersectPacket(origins, directions)
+
+	def occludedPacket(self, origins: np.ndarray, directions: np.ndarray, maxDistances: np.ndarray) -> np.ndarray:
+		"""Renvoie le masque des rayons coupés par un objet avant leur distance maximale."""
+		return self.accelerator.occludedPacket(origins, directions, maxDistances)
@@ -0,0 +1,443 @@
+from contextlib import contextmanager
+from functools import wraps
+from typing import Any, Callable, Iterator, Optional
+import json
+import os
+import threading
+import time
+import numpy as np
+
+RAY_KINDS = ("primary", "reflection", "refraction", "shadow")
+PHASES = ("build", "trace", "shade")
+HEATMAP_CHANNELS = ("rays", "tests", "time") # Canaux des heatmaps par pixel du Renderer
+
+# Palette des images de heatmap, du coût nul (noir) au plus élevé (jaune pâle)
+HEATMAP_COLOURS = np.array(((0, 0, 4), (87, 16, 110), (188, 55, 84), (249, 142, 9), (252, 255, 164)), dtype=np.float64)
+
+# Les mesures remplacent des méthodes partagées par tout le processus: un seul enregistrement à la fois
+_lock = threading.Lock()
+_recording: Optional["RenderStats"] = None
+
+class RenderStats:
+	"""
+	Compteurs et chronomètres d'un rendu: rayons par type, tests d'intersection par type d'objet, noeuds d'Octree
+	visités, triangles testés dans les feuilles et temps de construction, de traçage et d'ombrage.
+	Les mesures sont installées en remplaçant les méthodes concernées au niveau des classes, uniquement pendant
+	record(): un rendu sans statistiques exécute le code d'origine et ne paie rien.
+
+	Le remplacement vaut pour tout le processus, mais seuls les appels du thread qui enregistre sont comptés: un
+	autre thread qui rend en même temps n'est pas mesuré. Un seul RenderStats peut enregistrer à la fois, record()
+	lève RuntimeError depuis un autre thread ou pour d'autres statistiques. Dans le thread qui enregistre, tout
+	appel aux méthodes mesurées est compté, même s'il vient d'une autre scène ou d'un autre Renderer.
+	"""
+	rays: dict[str, int]
+	tests: dict[str, int]
+	octreeNodes: int
+	leafTriangles: dict[str, int]
+	times: dict[str, float]
+	wallTime: float
+	renders: int
+
+	def __init__(self) -> None:
+		self.reset()
+
+		self._depth = 0 # Imbrication des appels à record
+		self._thread: Optional[int] = None # Thread dont les appels sont comptés pendant record
+		self._phases: list[Optional[str]] = [] # Pile des phases en cours, le temps va à celle du sommet
+		self._mark = 0.0
+		self._kinds = ["primary"] # Pile des types des rayons en cours de traçage
+		self._emitting: list[int] = [] # Rayons émis par les appels imbriqués de reflectRays/refractRays en cours
+		self._testing = None # Objet en cours de test, pour ne pas compter deux fois ses appels internes
+		self._saved: list[tuple[Any, str, Any]] = []
+
+	def reset(self) -> None:
+		self.rays = dict.fromkeys(RAY_KINDS, 0)
+		self.tests = {}
+		self.octreeNodes = 0
+		self.leafTriangles = {}
+		self.shadowCache = {"hits": 0, "misses": 0}
+		self.times = dict.fromkeys(PHASES, 0.0)
+		self.wallTime = 0.0
+		self.renders = 0
+
+	def _credit(self) -> None:
+		# Attribue le temps écoulé depuis le dernier changement de phase à la phase en cours (None: non compté)
+		now = time.perf_counter()
+
+		if self._phases and self._phases[-1] is not None:
+			self.times[self._phases[-1]] += now - self._mark
+
+		self._mark = now
+
+	def _enter(self, phase: Optional[str]) -> None:
+		self._credit()
+		self._phases.append(phase)
+
+	def _leave(self) -> None:
+		self._credit()
+		self._phases.pop()
+
+	@contextmanager
+	def phase(self, name: Optional[str]) -> Iterator["RenderStats"]:
+		"""Chronomètre un bloc dans la phase name, en excluant le temps des phases imbriquées (par exemple la construction de la scène)."""
+		self._enter(name)
+		try:
+			yield self
+		finally:
+			self._leave()
+
+	@contextmanager
+	def record(self, phase: Optional[str] = "shade") -> Iterator["RenderStats"]:
+		"""
+		Installe les mesures pendant le bloc. Le temps qui n'est pas passé à construire ou à intersecter va à phase
+		(None pour un bloc qui ne fait qu'attendre, comme le processus principal du rendu parallèle).
+		"""
+		outermost = self._claim()
+
+		if outermost:
+			try:
+				self._install()
+			except BaseException:
+				self._release()
+				raise
+
+			start = time.perf_counter()
+
+		self._depth += 1
+		self._enter(phase)
+
+		try:
+			yield self
+		finally:
+			self._leave()
+			self._depth -= 1
+
+			if outermost:
+				self._uninstall()
+				self._release()
+				self.wallTime += time.perf_counter() - start
+				self.renders += 1
+
+	def _claim(self) -> bool:
+		"""Réserve l'enregistrement pour ce thread. Renvoie False pour un appel imbriqué du même thread."""
+		global _recording
+
+		with _lock:
+			if _recording is None:
+				_recording, self._thread = self, threading.get_ident()
+				return True
+
+			if _recording is self and self._thread == threading.get_ident():
+				return False
+
+		raise RuntimeError("Render statistics are already being recorded by another thread or RenderStats, recordings cannot overlap")
+
+	def _release(self) -> None:
+		global _recording
+
+		with _lock:
+			_recording, self._thread = None, None
+
+	def _measuring(self) -> bool:
+		"""Vrai si l'appel en cours vient du thread qui enregistre et doit être compté."""
+		return threading.get_ident() == self._thread
+
+	def _install(self) -> None:
+		self._saved = []
+
+		for owner, name, replacement in self._patches():
+			self._saved.append((owner, name, vars(owner)[name]))
+			setattr(owner, name, replacement)
+
+	def _uninstall(self) -> None:
+		for owner, name, original in reversed(self._saved):
+			setattr(owner, name, original)
+
+		self._saved = []
+
+	def _patches(self) -> list[tuple[Any, str, Callable]]:
+		"""Liste des (classe ou module, attribut, remplaçant) à installer pendant l'enregistrement."""
+		from classes.renderer import Renderer
+		from classes.scene import Scene
+		from classes.objects.object import Object
+		from classes.objects.octree import Cell, Octree
+		from classes.objects.bvh import BVH, TopLevelBVH
+		import classes.objects.octree as octree
+		import classes.objects.bvh as bvh
+		import classes.objects.sphere, classes.objects.plane, classes.objects.triangle, classes.objects.instance # Enregistre les sous-classes d'Object
+
+		patches = []
+
+		# Rayons primaires, réfléchis et réfractés: comptés quand ils sont tracés, avec le type du dernier rebond en cours
+		patches.append((Renderer, "traceRay", _tracingRay(self, Renderer.traceRay)))
+		patches.append((Renderer, "traceRays", _tracingRays(self, Renderer.traceRays)))
+
+		for name, kind in (("reflectRay", "reflection"), ("refractRay", "refraction")):
+			patches.append((Renderer, name, _spawning(self, kind, getattr(Renderer, name))))
+
+		# Moteur wavefront: les rayons secondaires sont comptés quand ils sont émis dans la file de la génération suivante
+		for name, kind in (("reflectRays", "reflection"), ("refractRays", "refraction")):
+			patches.append((Renderer, name, _emitting(self, kind, getattr(Renderer, name))))
+
+		# Requêtes à la scène: temps de traçage et rayons d'ombre
+		for name, shadow, packet in (("intersect", False, False), ("occluded", True, False), ("intersectPacket", False, True), ("occludedPacket", True, True)):
+			patches.append((Scene, name, _querying(self, getattr(Scene, name), shadow, packet)))
+
+		# Cache du dernier objet bloquant chaque lumière (rayons d'ombre scalaires)
+		patches.append((Scene, "lastOccluderBlocks", _caching(self, Scene.lastOccluderBlocks)))
+
+		# Tests d'intersection par type d'objet
+		classes, pending = [Object], [Object]
+
+		while pending:
+			for subclass in pending.pop().__subclasses__():
+				classes.append(subclass)
+				pending.append(subclass)
+
+		for cls in classes:
+			for name, packet in (("hit", False), ("occludes", False), ("hitPacket", True), ("occludesPacket", True)):
+				method = vars(cls).get(name)
+
+				if callable(method) and not getattr(method, "__isabstractmethod__", False):
+					patches.append((cls, name, _testingObject(self, method, packet)))
+
+		# Noeuds de l'Octree et triangles testés dans les feuilles
+		patches.append((Cell, "hit", _counting(self, Cell.hit, lambda cell, ray: 1, nodes=True)))
+		patches.append((Cell, "hitPacket", _counting(self, Cell.hitPacket, lambda cell, origins, directions: len(origins), nodes=True)))
+
+		for module, structure in ((octree, "Octree"), (bvh, "BVH")):
+			patches.append((module, "closest_triangle", _counting(self, module.closest_triangle, lambda origin, direction, packed, *args: len(packed[1]), structure)))
+			patches.append((module, "any_triangle", _counting(self, module.any_triangle, lambda origin, direction, packed, *args: len(packed[1]), structure)))
+			patches.append((module, "intersect_triangles", _counting(self, module.intersect_triangles, lambda origins, directions, v0, *args: len(origins) * len(v0), structure)))
+
+		# Construction des structures d'accélération
+		for owner, name in ((TopLevelBVH, "__init__"), (BVH, "__init__"), (Octree, "__init__"), (Octree, "generate_octree")):
+			patches.append((owner, name, _building(self, getattr(owner, name))))
+
+		return patches
+
+	def counters(self) -> np.ndarray:
+		"""
+		Valeurs courantes des canaux de HEATMAP_CHANNELS: rayons tracés, tests d'intersection (objets et triangles des
+		feuilles) et horloge en secondes. La différence entre deux appels donne le coût d'un pixel.
+		"""
+		return np.array((sum(self.rays.values()), sum(self.tests.values()) + sum(self.leafTriangles.values()), time.perf_counter()))
+
+	def report(self) -> dict:
+		"""Rapport structuré (sérialisable en JSON) des mesures accumulées."""
+		total = sum(self.rays.values())
+
+		return {
+			"renders": self.renders,
+			"wallTime": self.wallTime,
+			"time": dict(self.times),
+			"rays": {**self.rays, "total": total},
+			"raysPerSecond": total / self.wallTime if self.wallTime > 0 else 0.0,
+			"intersectionTests": dict(sorted(self.tests.items())),
+			"octreeNodesVisited": self.octreeNodes,
+			"leafTrianglesTested": dict(sorted(self.leafTriangles.items())),
+			"shadowCache": {**self.shadowCache, "hitRate": self.shadowCache["hits"] / max(1, sum(self.shadowCache.values()))},
+		}
+
+	def merge(self, report: dict) -> None:
+		"""Ajoute les compteurs et les temps d'un rapport (par exemple celui d'une tuile rendue par un autre processus)."""
+		for kind in RAY_KINDS:
+			self.rays[kind] += report["rays"][kind]
+
+		for phase in PHASES:
+			self.times[phase] += report["time"][phase]
+
+		for name, count in report["intersectionTests"].items():
+			self.tests[name] = self.tests.get(name, 0) + count
+
+		for name, count in report["leafTrianglesTested"].items():
+			self.leafTriangles[name] = self.leafTriangles.get(name, 0) + count
+
+		self.octreeNodes += report["octreeNodesVisited"]
+
+		for name in self.shadowCache:
+			self.shadowCache[name] += report["shadowCache"][name]
+
+	def summary(self) -> str:
+		"""Résumé lisible du rapport."""
+		report = self.report()
+		rays = report["rays"]
+
+		lines = [
+			f"Render statistics: {report['renders']} render(s), {report['wallTime']:.2f} s wall time",
+			"  time:   " + ", ".join(f"{phase} {seconds:.2f} s" for phase, seconds in report["time"].items()),
+			f"  rays:   {rays['total']:,} ({report['raysPerSecond']:,.0f} rays/s): " + ", ".join(f"{kind} {rays[kind]:,}" for kind in RAY_KINDS),
+			"  tests:  " + (", ".join(f"{name} {count:,}" for name, count in report["intersectionTests"].items()) or "none"),
+			f"  octree: {report['octreeNodesVisited']:,} nodes visited",
+			"  leaves: " + (", ".join(f"{name} {count:,} triangles" for name, count in report["leafTrianglesTested"].items()) or "none"),
+			f"  shadow cache: {report['shadowCache']['hits']:,} hits, {report['shadowCache']['misses']:,} misses ({report['shadowCache']['hitRate']:.0%})",
+		]
+
+		return "\n".join(lines)
+
+	def save(self, path: str) -> None:
+		"""Écrit le rapport au format JSON."""
+		with open(path, "w") as file:
+			json.dump(self.report(), file, indent=2)
+
+def falseColour(values: np.ndarray) -> np.ndarray:
+	"""Image RGB (uint8) d'une carte 2D de coûts. L'échelle va de 0 au 99e centile, pour que quelques pixels extrêmes n'écrasent pas le reste."""
+	scale = np.percentile(values, 99)
+	normalized = np.clip(values / scale, 0.0, 1.0) if scale > 0 else np.zeros(values.shape)
+
+	position = normalized * (len(HEATMAP_COLOURS) - 1)
+	index = np.minimum(position.astype(np.int64), len(HEATMAP_COLOURS) - 2)
+	fraction = (position - index)[..., None]
+
+	return (HEATMAP_COLOURS[index] * (1.0 - fraction) + HEATMAP_COLOURS[index + 1] * fraction).round().astype(np.uint8)
+
+def profiled(phase: Optional[str] = "shade") -> Callable[[Callable], Callable]:
+	"""Décorateur des méthodes de rendu du Renderer: enregistre les statistiques si renderer.stats n'est pas None."""
+	def decorator(method: Callable) -> Callable:
+		@wraps(method)
+		def wrapper(renderer, *args, **kwargs):
+			if renderer.stats is None:
+				return method(renderer, *args, **kwargs)
+
+			with renderer.stats.record(phase):
+				return method(renderer, *args, **kwargs)
+
+		return wrapper
+
+	return decorator
+
+def _tracingRay(stats: RenderStats, original: Callable) -> Callable:
+	def wrapper(renderer, scene, ray, depth=0, weight=None):
+		if depth < renderer.maxDepth and stats._measuring():
+			stats.rays["primary" if depth == 0 else stats._kinds[-1]] += 1
+
+		return original(renderer, scene, ray, depth, weight)
+
+	return wrapper
+
+def _tracingRays(stats: RenderStats, original: Callable) -> Callable:
+	def wrapper(renderer, scene, origins, directions, depth=0, weights=None):
+		if depth < renderer.maxDepth and stats._measuring():
+			stats.rays["primary" if depth == 0 else stats._kinds[-1]] += len(directions)
+
+		return original(renderer, scene, origins, directions, depth, weights)
+
+	return wrapper
+
+def _spawning(stats: RenderStats, kind: str, original: Callable) -> Callable:
+	def wrapper(*args, **kwargs):
+		if not stats._measuring():
+			return original(*args, **kwargs)
+
+		stats._kinds.append(kind)
+		try:
+			return original(*args, **kwargs)
+		finally:
+			stats._kinds.pop()
+
+	return wrapper
+
+def _emitting(stats: RenderStats, kind: str, original: Callable) -> Callable:
+	def wrapper(*args, **kwargs):
+		if not stats._measuring():
+			return original(*args, **kwargs)
+
+		# Les réflexions totales internes de refractRays sont émises par un appel imbriqué à reflectRays
+		stats._emitting.append(0)
+		try:
+			queue = original(*args, **kwargs)
+		finally:
+			nested = stats._emitting.pop()
+
+		stats.rays[kind] += len(queue) - nested
+
+		if stats._emitting:
+			stats._emitting[-1] += len(queue)
+
+		return queue
+
+	return wrapper
+
+def _caching(stats: RenderStats, original: Callable) -> Callable:
+	def wrapper(scene, *args):
+		blocked = original(scene, *args)
+
+		if stats._measuring():
+			stats.shadowCache["hits" if blocked else "misses"] += 1
+
+		return blocked
+
+	return wrapper
+
+def _querying(stats: RenderStats, original: Callable, shadow: bool, packet: bool) -> Callable:
+	def wrapper(scene, *args):
+		if not stats._measuring():
+			return original(scene, *args)
+
+		if shadow:
+			stats.rays["shadow"] += len(args[1]) if packet else 1
+
+		stats._enter("trace")
+		try:
+			return original(scene, *args)
+		finally:
+			stats._leave()
+
+	return wrapper
+
+def _testingObject(stats: RenderStats, original: Callable, packet: bool) -> Callable:
+	def wrapper(obj, *args):
+		# Les implémentations par défaut d'Object se rappellent entre elles (occludes -> hit): un seul test
+		if stats._testing is obj or not stats._measuring():
+			return original(obj, *args)
+
+		name = type(obj).__name__
+		stats.tests[name] = stats.tests.get(name, 0) + (len(args[1]) if packet else 1)
+
+		outer, stats._testing = stats._testing, obj
+		try:
+			return original(obj, *args)
+		finally:
+			stats._testing = outer
+
+	return wrapper
+
+def _counting(stats: RenderStats, original: Callable, count: Callable, structure: Optional[str] = None, nodes: bool = False) -> Callable:
+	def wrapper(*args):
+		if not stats._measuring():
+			return original(*args)
+
+		if nodes:
+			stats.octreeNodes += count(*args)
+		else:
+			stats.leafTriangles[structure] = stats.leafTriangles.get(structure, 0) + count(*args)
+
+		return original(*args)
+
+	return wrapper
+
+def _building(stats: RenderStats, original: Callable) -> Callable:
+	def wrapper(*args, **kwargs):
+		if not stats._measuring():
+			return original(*args, **kwargs)
+
+		with stats.phase("build"):
+			return original(*args, **kwargs)
+
+	return wrapper
+
+def _forked() -> None:
+	# Un processus créé pendant un enregistrement (pool du rendu parallèle) hérite des méthodes remplacées:
+	# il les restaure pour pouvoir enregistrer ses propres statistiques
+	global _lock, _recording
+
+	if _recording is not None:
+		_recording._uninstall()
+		_recording._depth = 0
+		_recording._phases = []
+		_recording._thread = None
+
+	_lock, _recording = threading.Lock(), None
+
+if hasattr(os, "register_at_fork"):
+	os.register_at_fork(after_in_child=_forked)
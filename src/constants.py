@@ -1,6 +1,22 @@
+import os
+
 SCREEN_WIDTH = 800
 SCREEN_HEIGHT = 600
 SAMPLES = 1
 MAX_DEPTH = 5
+MIN_WEIGHT = 0.01 # Contribution minimale d'un rayon secondaire à la couleur du pixel (produit des coefficients le long du chemin)
+RUSSIAN_ROULETTE = False # Sous MIN_WEIGHT: False abandonne le rayon, True le prolonge avec une probabilité proportionnelle à son poids (sans biais)
 AMBIANT_LIGHT = 0.1
-EPSILON = 1e-4
\ No newline at end of file
+LIGHT_CUTOFF = 1e-3 # Éclairement maximal (intensité x couleur x atténuation) sous lequel une lumière est ignorée, 0 pour tout évaluer
+LIGHT_SAMPLES = None # Nombre de lumières tirées par point selon leur contribution estimée (None: toutes)
+EPSILON = 1e-4
+PACKET_SIZE = 65536
+WORKERS = None # Nombre de processus pour le rendu parallèle (None = tous les coeurs)
+TILE_SIZE = 32
+STATS = False # Statistiques du rendu (rayons, tests d'intersection, temps par phase), écrites à côté de l'image
+HEATMAP = False # Coût de chaque pixel (rayons, tests d'intersection, temps) enregistré à côté de l'image, rendu scalaire uniquement
+ADAPTIVE_THRESHOLD = 0.01 # Erreur type maximale de la couleur d'un pixel pour l'anti-aliasing adaptatif
+MIN_SAMPLES = 4 # Échantillons par pixel avant d'estimer l'erreur
+MAX_SAMPLES = 64 # Budget maximal d'échantillons par pixel
+ASSETS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "assets") # Modèles chargés par les scènes
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache") # Structures d'accélération précalculées
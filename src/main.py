@@ -1,8 +1,7 @@
 from classes.renderer import Renderer
-from classes.scene import Scene
 from glm import vec3
 from classes.camera import Camera
-from constants import SCREEN_HEIGHT, SCREEN_WIDTH, SAMPLES, MAX_DEPTH
+from constants import SCREEN_HEIGHT, SCREEN_WIDTH, SAMPLES, MAX_DEPTH, WORKERS, TILE_SIZE, STATS, HEATMAP
 
 # Differente scenes
 from scenes.main import createMain
@@ -14,7 +13,7 @@ from scenes.water_drop import createWaterDrop
 
 def main():
 	camera = Camera(fov_y=90, position=vec3(0, 0, 0), target=vec3(0, 0, -1))
-	renderer = Renderer(camera, SCREEN_WIDTH, SCREEN_HEIGHT, SAMPLES, MAX_DEPTH)
+	renderer = Renderer(camera, SCREEN_WIDTH, SCREEN_HEIGHT, SAMPLES, MAX_DEPTH, stats=STATS, heatmap=HEATMAP)
 	
 	# Rendre toutes les scènes
 	scenes = [
@@ -24,15 +23,16 @@ def main():
 	for name, createScene in scenes:
 		print(f"Rendering {name}...")
 
-		scene = Scene()
-
-		createScene(scene)
-
+		# Chaque processus construit sa propre scène à partir de createScene
 		renderer.clear()
-		renderer.render(scene)
+		renderer.renderParallel(createScene, WORKERS, TILE_SIZE)
 		renderer.save(f"./output/{name}.png")
 
 		print(f"Saved {name}.png")
+
+		if renderer.stats is not None:
+			print(renderer.stats.summary())
+			renderer.stats.save(f"./output/{name}.stats.json")
 	
 	print("All scenes rendered!")
 
@@ -1,24 +1,24 @@
 from glm import vec3
+import os
 from utils.parser import parse_obj
-from classes.objects.octree import Octree
+from classes.objects.bvh import BVH
 from classes.scene import Scene
 from classes.material import Material
 from classes.lights.spot_light import SpotLight
 from scenes.box import createBox
+from constants import ASSETS_DIR, CACHE_DIR
 import math
 
 def createGlassBunnySpotlight(scene: Scene) -> None:
 	createBox(scene)
 	
 	#Lapin en verre avec deux spotlights
-	bunny_model = parse_obj("../assets/bunny.obj")
+	bunny_model = parse_obj(os.path.join(ASSETS_DIR, "bunny.obj"))
 	bunny_model.scale(10)
 	bunny_model.translate(vec3(0, -1, -2.5))
-	bunny_model.generate_triangles()
 	
 	# Verre avec reflets
-	bunny = Octree(model=bunny_model, material=Material(color=vec3(1, 1, 1), diffuse=0.0, refractivity=1.0, IOR=1.5))
-	bunny.generate_octree()
+	bunny = BVH(model=bunny_model, material=Material(color=vec3(1, 1, 1), diffuse=0.0, refractivity=1.0, IOR=1.5), cache=CACHE_DIR)
 	
 	scene.addObjects(bunny)
 	
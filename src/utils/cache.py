@@ -0,0 +1,77 @@
+import json
+import os
+from typing import Optional
+
+import numpy as np
+
+# Flat binary files holding named arrays: magic, header size, JSON header, then the 64-byte aligned arrays
+CACHE_MAGIC = b"RTCACHE"
+CACHE_ALIGNMENT = 64
+
+def aligned(size):
+    return -(-size // CACHE_ALIGNMENT) * CACHE_ALIGNMENT
+
+def write_arrays(file_name, header: dict, arrays: dict):
+    """
+    Write arrays to a cache file along with a JSON serializable header. Returns False, without raising,
+    if the file couldn't be written (read-only directory, full disk...), a cache being optional.
+    """
+    layout = {}
+    offset = 0
+    for name, array in arrays.items():
+        layout[name] = [array.dtype.str, list(array.shape), offset]
+        offset += aligned(array.nbytes)
+
+    # Array offsets are relative to the aligned end of the header
+    encoded = json.dumps({"header": header, "arrays": layout}).encode()
+    start = aligned(len(CACHE_MAGIC) + 8 + len(encoded))
+
+    # Write to a temporary file first so that concurrent loads never map a partial cache
+    temporary = f"{file_name}.{os.getpid()}.tmp"
+    try:
+        directory = os.path.dirname(file_name)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        with open(temporary, "wb") as f:
+            f.write(CACHE_MAGIC)
+            f.write(len(encoded).to_bytes(8, "little"))
+            f.write(encoded)
+            for name, array in arrays.items():
+                f.seek(start + layout[name][2])
+                f.write(np.ascontiguousarray(array).tobytes())
+            f.truncate(start + offset)
+        os.replace(temporary, file_name)
+        return True
+    except OSError:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+        return False
+
+def read_arrays(file_name) -> Optional[tuple[dict, dict]]:
+    """Returns the header and the memory-mapped (read-only) arrays of a cache file, or None if it is missing or invalid."""
+    contents = _read_contents(file_name)
+    if contents is None:
+        return None
+
+    contents, start = contents
+    arrays = {}
+    for name, (dtype, shape, offset) in contents["arrays"].items():
+        if 0 in shape:
+            arrays[name] = np.zeros(shape, dtype=dtype)
+        else:
+            arrays[name] = np.memmap(file_name, dtype=dtype, mode="r", offset=start + offset, shape=tuple(shape))
+
+    return contents["header"], arrays
+
+def _read_contents(file_name):
+    try:
+        with open(file_name, "rb") as f:
+            if f.read(len(CACHE_MAGIC)) != CACHE_MAGIC:
+                return None
+            size = int.from_bytes(f.read(8), "little")
+            contents = json.loads(f.read(size))
+    except (OSError, ValueError):
+        return None
+
+    return contents, aligned(len(CACHE_MAGIC) + 8 + size)
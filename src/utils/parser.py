@@ -1,19 +1,205 @@
-from pyglm import glm
+import hashlib
+import os
+import re
+from typing import NamedTuple, Optional
+
+import numpy as np
 from classes.model import Model
+from utils.cache import read_arrays, write_arrays
+
+# Binary mesh cache written next to the source file, bump the version when its layout changes
+CACHE_SUFFIX = ".meshcache"
+CACHE_VERSION = 2
+
+# Statements are extracted from the whole file at once, the groups hold the values after the keyword
+VERTEX = re.compile(rb"^[ \t]*v[ \t]+([^\r\n]*)", re.M)
+NORMAL = re.compile(rb"^[ \t]*vn[ \t]+([^\r\n]*)", re.M)
+TEXCOORD = re.compile(rb"^[ \t]*vt[ \t]+([^\r\n]*)", re.M)
+FACE = re.compile(rb"^[ \t]*f[ \t]+([^\r\n]*)", re.M)
+COMMENT = re.compile(rb"#[^\r\n]*")
+
+class ObjMesh(NamedTuple):
+    """Triangulated OBJ contents. Index arrays are 0-based, -1 where a corner has no normal/texcoord."""
+    vertices: np.ndarray         # (N,3) float32
+    faces: np.ndarray            # (M,3) int32, into vertices
+    normals: np.ndarray          # (K,3) float32
+    face_normals: np.ndarray     # (M,3) int32, into normals
+    texcoords: np.ndarray        # (T,2) float32
+    face_texcoords: np.ndarray   # (M,3) int32, into texcoords
+
+def parse_floats(lines, columns):
+    """Parse the values of every line (without its keyword) into a (len(lines), columns) array."""
+    if not lines:
+        return np.zeros((0, columns), dtype=np.float32)
+
+    sizes = tokens_per_line(b"\n".join(lines), len(lines))
+    width = int(sizes[0])
+
+    # Fast path: every line has the same number of values (extra ones, like w or vertex colors, are dropped)
+    if np.all(sizes == width) and width >= columns:
+        values = b" ".join(lines).split()
+        return np.array(values, dtype=np.float64).reshape(-1, width)[:, :columns].astype(np.float32)
+
+    rows = [line.split()[:columns] for line in lines]
+    rows = [row + [b"0"] * (columns - len(row)) for row in rows]
+    return np.array(rows, dtype=np.float64).astype(np.float32).reshape(-1, columns)
+
+def token_starts(chars):
+    """Mask of the first character of every whitespace separated token of a uint8 text array."""
+    separator = (chars == ord(" ")) | (chars == ord("\t")) | (chars == ord("\n"))
+    return ~separator & np.concatenate(([True], separator[:-1]))
+
+def count_per_token(text, character):
+    """Number of occurrences of a character in each whitespace separated token of text."""
+    chars = np.frombuffer(text, dtype=np.uint8)
+    starts = token_starts(chars)
+    return np.bincount(np.cumsum(starts) - 1, weights=(chars == ord(character)), minlength=int(starts.sum()))
+
+def tokens_per_line(text, line_count):
+    """Number of whitespace separated tokens on each line of text."""
+    chars = np.frombuffer(text, dtype=np.uint8)
+    line = np.cumsum(chars == ord("\n"))
+    return np.bincount(line[token_starts(chars)], minlength=line_count)
+
+def parse_corners(tokens):
+    """Parse face corners ("v", "v/vt", "v//vn" or "v/vt/vn") into a (len(tokens), 3) array, 0 where missing."""
+    if not tokens:
+        return np.zeros((0, 3), dtype=np.int64)
+
+    corners = np.zeros((len(tokens), 3), dtype=np.int64)
+
+    # Fast path: every corner has the same number of slashes (missing indices are written as 0)
+    text = b" ".join(tokens).replace(b"//", b"/0/")
+    slashes = count_per_token(text, "/")
+    if np.all(slashes == slashes[0]) and slashes[0] <= 2:
+        width = int(slashes[0]) + 1
+        corners[:, :width] = np.array(text.replace(b"/", b" ").split(), dtype=np.int64).reshape(len(tokens), width)
+        return corners
+
+    for i, token in enumerate(tokens):
+        for j, value in enumerate(token.split(b"/")[:3]):
+            if value:
+                corners[i, j] = int(value)
+    return corners
+
+def resolve_indices(indices, declared, total, name):
+    """
+    Turn 1-based OBJ indices into 0-based ones, -1 where missing. declared[i] is the number of elements
+    declared before the face of corner i, which negative (relative) indices refer to.
+    """
+    resolved = np.where(indices > 0, indices - 1, declared + indices)
+    resolved[indices == 0] = -1
+
+    if np.any((indices != 0) & ((resolved < 0) | (resolved >= total))):
+        raise ValueError(f"OBJ face references an undefined {name}")
+
+    return resolved
+
+def read_obj(file_name) -> ObjMesh:
+    """Parse an OBJ file into NumPy arrays. Polygons are triangulated as fans around their first corner."""
+    with open(file_name, "rb") as f:
+        data = f.read()
+
+    # Comments may end any line ("f 1 2 3 # tri"), they are removed before the statements are extracted
+    data = COMMENT.sub(b"", data)
+
+    vertices = parse_floats(VERTEX.findall(data), 3)
+    normals = parse_floats(NORMAL.findall(data), 3)
+    texcoords = parse_floats(TEXCOORD.findall(data), 2)
+    face_lines = FACE.findall(data)
+
+    text = b"\n".join(face_lines)
+    tokens = text.split()
+    sizes = tokens_per_line(text, len(face_lines))
+    if np.any(sizes < 3):
+        raise ValueError("OBJ face with less than 3 vertices")
+
+    corners = parse_corners(tokens)
+    if np.any(corners[:, 0] == 0):
+        raise ValueError("OBJ face corner without vertex index")
+
+    # Negative indices are relative to the elements declared before the face, located only when needed
+    declared = np.zeros(corners.shape, dtype=np.int64)
+    if np.any(corners < 0):
+        faces = [match.start() for match in FACE.finditer(data)]
+        for column, statement in enumerate((VERTEX, TEXCOORD, NORMAL)):
+            positions = [match.start() for match in statement.finditer(data)]
+            declared[:, column] = np.repeat(np.searchsorted(positions, faces), sizes)
+
+    corners = np.stack([
+        resolve_indices(corners[:, 0], declared[:, 0], len(vertices), "vertex"),
+        resolve_indices(corners[:, 1], declared[:, 1], len(texcoords), "texture coordinate"),
+        resolve_indices(corners[:, 2], declared[:, 2], len(normals), "normal"),
+    ], axis=1)
+
+    # Fan triangulation: triangle k of a face uses its corners 0, k+1, k+2
+    triangles = sizes - 2
+    first_corner = np.cumsum(sizes) - sizes
+    face = np.repeat(np.arange(len(sizes)), triangles)
+    k = np.arange(int(triangles.sum())) - np.repeat(np.cumsum(triangles) - triangles, triangles)
+    start = first_corner[face]
+    triangle_corners = corners[np.stack([start, start + k + 1, start + k + 2], axis=1)]
+
+    return ObjMesh(
+        vertices,
+        triangle_corners[:, :, 0].astype(np.int32),
+        normals,
+        triangle_corners[:, :, 2].astype(np.int32),
+        texcoords,
+        triangle_corners[:, :, 1].astype(np.int32),
+    )
+
+def file_hash(file_name):
+    digest = hashlib.blake2b(digest_size=16)
+    with open(file_name, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def read_cache(cache_name, file_name, stat) -> Optional[ObjMesh]:
+    """Memory-map the arrays of a cache file, or return None if it is missing, stale or unreadable."""
+    cached = read_arrays(cache_name)
+    if cached is None:
+        return None
+
+    header, arrays = cached
+    if header.get("version") != CACHE_VERSION or header.get("size") != stat.st_size:
+        return None
+
+    # A different mtime with the same size (copy, checkout, touch) is still valid if the contents match
+    if header.get("mtime") != stat.st_mtime_ns and header.get("hash") != file_hash(file_name):
+        return None
+
+    return ObjMesh(*(arrays[name] for name in ObjMesh._fields))
+
+def write_cache(cache_name, file_name, stat, mesh: ObjMesh):
+    header = {
+        "version": CACHE_VERSION,
+        "size": stat.st_size,
+        "mtime": stat.st_mtime_ns,
+        "hash": file_hash(file_name),
+    }
+    write_arrays(cache_name, header, mesh._asdict())
+
+def load_obj(file_name, cache=True) -> ObjMesh:
+    """
+    Load an OBJ file as NumPy arrays. With cache, the arrays are stored in a binary file next to the
+    source (file_name + CACHE_SUFFIX) and memory-mapped on the next loads while the source is unchanged.
+    """
+    if not cache:
+        return read_obj(file_name)
+
+    stat = os.stat(file_name)
+    cache_name = file_name + CACHE_SUFFIX
+
+    mesh = read_cache(cache_name, file_name, stat)
+    if mesh is None:
+        mesh = read_obj(file_name)
+        write_cache(cache_name, file_name, stat, mesh)
+
+    return mesh
+
+def parse_obj(file_name, cache=True):
+    mesh = load_obj(file_name, cache)
 
-def parse_obj(file_name):
-    current_text = None
-    vertex_array = []
-    faces_array = []
-
-    with open(file=file_name) as f:
-        for current_text in f:
-            current_line = current_text.split(" ")
-            if current_line[0] == "v":
-                vertex = glm.vec3(float(current_line[1]), float(current_line[2]), float(current_line[3].rstrip()))
-                vertex_array.append(vertex)
-            elif(current_line[0] == "f"):
-                face = [int(current_line[1])-1, int(current_line[2])-1, int(current_line[3].rstrip())-1]
-                faces_array.append(face)
-
-    return Model(vertex_array, faces_array)
\ No newline at end of file
+    return Model(mesh.vertices, mesh.faces)
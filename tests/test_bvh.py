@@ -0,0 +1,20 @@
+import numpy as np
+from pyglm import glm
+
+from classes.model import Model
+from classes.objects.bvh import BVH
+from classes.ray import Ray
+
+def test_empty_model():
+    bvh = BVH(Model(np.zeros((0, 3), dtype=np.float32), np.zeros((0, 3), dtype=np.int32)))
+    # The empty root box sits at the origin, on the path of the rays
+    ray = Ray(glm.vec3(1, 1, 1), glm.normalize(glm.vec3(-1, -1, -1)))
+
+    assert bvh.hit(ray) is None
+    assert not bvh.occludes(ray, 10.0)
+
+    origins, directions = np.array([[1.0, 1.0, 1.0]]), np.array([[-1.0, -1.0, -1.0]]) / np.sqrt(3.0)
+    distances, triangles = bvh.hitPacket(origins, directions)
+    np.testing.assert_array_equal(distances, [np.inf])
+    np.testing.assert_array_equal(triangles, [-1])
+    np.testing.assert_array_equal(bvh.occludesPacket(origins, directions, np.array([10.0])), [False])
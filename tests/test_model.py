@@ -0,0 +1,16 @@
+import numpy as np
+from pyglm import glm
+
+from classes.model import Model, scale_matrix
+
+def test_scale_matrix_scalars():
+    for factor in (2, 2.0, np.float32(2), np.int64(2), np.array(2.0)):
+        np.testing.assert_array_equal(np.diag(scale_matrix(factor)), [2, 2, 2, 1])
+
+    np.testing.assert_array_equal(np.diag(scale_matrix(glm.vec3(1, 2, 3))), [1, 2, 3, 1])
+
+def test_scale_numpy_factor():
+    model = Model(np.array([[1, 1, 1], [0, 0, 0], [1, 0, 0]], dtype=np.float32), np.array([[0, 1, 2]], dtype=np.int32))
+    model.scale(np.float32(2))
+
+    np.testing.assert_array_equal(model.vertices[0], [2, 2, 2])
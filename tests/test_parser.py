@@ -0,0 +1,47 @@
+import numpy as np
+
+from utils.parser import load_obj, read_obj
+
+def write(tmp_path, text):
+    path = tmp_path / "mesh.obj"
+    path.write_bytes(text.encode())
+    return str(path)
+
+def test_inline_comments(tmp_path):
+    file_name = write(tmp_path, (
+        "# header\n"
+        "v 0 0 0 # origin\n"
+        "v 1 0 0\n"
+        "v 0 1 0#no space\n"
+        "f 1 2 3 # tri\n"
+        "# f 3 2 1\n"
+    ))
+
+    mesh = read_obj(file_name)
+
+    np.testing.assert_array_equal(mesh.vertices, [[0, 0, 0], [1, 0, 0], [0, 1, 0]])
+    np.testing.assert_array_equal(mesh.faces, [[0, 1, 2]])
+
+def test_inline_comments_cached(tmp_path):
+    file_name = write(tmp_path, "v 0 0 0\nv 1 0 0\nv 0 1 0\nf 1 2 3 # tri\n")
+
+    first = load_obj(file_name)
+    second = load_obj(file_name)
+
+    np.testing.assert_array_equal(first.faces, [[0, 1, 2]])
+    np.testing.assert_array_equal(second.faces, first.faces)
+
+def test_mixed_vertex_widths(tmp_path):
+    # Vertex colours on some vertices only: the line widths differ but their total divides evenly
+    file_name = write(tmp_path, (
+        "v 0 0 0 1 0 0\n"
+        "v 1 0 0 0 1 0\n"
+        "v 0 1 0\n"
+        "v 1 1 0\n"
+        "v 0 0 1\n"
+        "v 1 0 1\n"
+        "f 1 2 3\n"
+    ))
+
+    for mesh in (read_obj(file_name), load_obj(file_name), load_obj(file_name)):
+        np.testing.assert_array_equal(mesh.vertices, [[0, 0, 0], [1, 0, 0], [0, 1, 0], [1, 1, 0], [0, 0, 1], [1, 0, 1]])
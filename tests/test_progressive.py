@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+from pyglm import glm
+
+from classes.camera import Camera
+from classes.renderer import Renderer
+from classes.samplers.halton_sampler import HaltonSampler
+from classes.scene import Scene
+from scenes.glass_spheres import createGlassSpheres
+from scenes.mirror_spheres import createMirrorSpheres
+
+PASSES = 4
+
+def renderer(sampler=None):
+    return Renderer(Camera(90, glm.vec3(0, 0, 0), glm.vec3(0, 0, -1)), 16, 12, PASSES, 5, sampler=sampler)
+
+def scene(create=createGlassSpheres):
+    scene = Scene()
+    create(scene)
+    return scene
+
+class Interrupted(Exception):
+    pass
+
+def interrupt(monkeypatch, passes):
+    """Stops the next progressive render after passes passes, once their checkpoint is written."""
+    original = Renderer.saveCheckpoint
+    written = []
+
+    def saveCheckpoint(self, path, parameters=None):
+        original(self, path, parameters)
+        written.append(path)
+
+        if len(written) == passes:
+            raise Interrupted
+
+    monkeypatch.setattr(Renderer, "saveCheckpoint", saveCheckpoint)
+
+@pytest.mark.parametrize("packet", (False, True))
+def test_resume_matches_uninterrupted(tmp_path, monkeypatch, packet):
+    reference = renderer()
+    reference.renderProgressive(scene(), packet=packet)
+
+    path = str(tmp_path / "checkpoint.npz")
+
+    with monkeypatch.context() as patch:
+        interrupt(patch, 2)
+        with pytest.raises(Interrupted):
+            renderer().renderProgressive(scene(), packet=packet, checkpointPath=path)
+
+    # Only the passes after the checkpoint are traced again
+    traced = []
+    tracePixels = Renderer.tracePixels
+    monkeypatch.setattr(Renderer, "tracePixels", lambda self, *args: traced.append(1) or tracePixels(self, *args))
+
+    resumed = renderer()
+    resumed.renderProgressive(scene(), packet=packet, checkpointPath=path)
+
+    assert len(traced) == PASSES - 2
+
+    np.testing.assert_array_equal(resumed.sampleCount, PASSES)
+    np.testing.assert_array_equal(resumed.output, reference.output)
+
+@pytest.mark.parametrize("change, expected", (
+    (lambda: (renderer(HaltonSampler(seed=1)), scene(), PASSES), "sampler"),
+    (lambda: (renderer(), scene(createMirrorSpheres), PASSES), "scene"),
+    (lambda: (renderer(), scene(), PASSES + 1), "passes"),
+))
+def test_resume_refuses_other_parameters(tmp_path, monkeypatch, change, expected):
+    path = str(tmp_path / "checkpoint.npz")
+
+    with monkeypatch.context() as patch:
+        interrupt(patch, 1)
+        with pytest.raises(Interrupted):
+            renderer().renderProgressive(scene(), packet=True, checkpointPath=path)
+
+    other, otherScene, passes = change()
+
+    with pytest.raises(ValueError, match=expected):
+        other.renderProgressive(otherScene, passes=passes, packet=True, checkpointPath=path)